@@ -0,0 +1,39 @@
+"""Общие настройки для примеров: данные входа из переменных окружения."""
+
+import functools
+import os
+from dataclasses import dataclass
+
+_PLACEHOLDER_URL = "https://sgo.your-region.ru"
+
+
+@dataclass(frozen=True, slots=True)
+class AuthEnv:
+    """Параметры входа, прочитанные из ENV."""
+
+    url: str
+    # SGO
+    ns_login: str | None
+    ns_password: str | None
+    ns_school: str | None
+    # ESIA
+    esia_login: str | None
+    esia_password: str | None
+
+    @property
+    def has_url(self) -> bool:
+        """Задан ли реальный URL дневника (а не заглушка)."""
+        return "your-region.ru" not in self.url
+
+
+@functools.cache
+def load_auth_env() -> AuthEnv:
+    """Прочитать NS_* / ESIA_* переменные окружения (один раз)."""
+    return AuthEnv(
+        url=os.getenv("NS_URL", _PLACEHOLDER_URL),
+        ns_login=os.getenv("NS_LOGIN"),
+        ns_password=os.getenv("NS_PASSWORD"),
+        ns_school=os.getenv("NS_SCHOOL"),
+        esia_login=os.getenv("ESIA_LOGIN"),
+        esia_password=os.getenv("ESIA_PASSWORD"),
+    )
@@ -0,0 +1,42 @@
+"""Простой дисковый кэш результатов опроса серверов для примеров.
+
+Версии серверов и списки школ меняются редко, поэтому повторный
+запуск примера может не ходить в сеть: ответы хранятся в
+``~/.cache/netschoolpy/probe.json`` вместе с временем получения.
+"""
+
+import json
+import pathlib
+import time
+
+CACHE_PATH = pathlib.Path("~/.cache/netschoolpy/probe.json").expanduser()
+TTL = 3600  # секунд
+
+
+def load() -> dict:
+    """Прочитать кэш с диска (пустой словарь, если файла нет)."""
+    try:
+        return json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save(cache: dict) -> None:
+    """Записать кэш на диск."""
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    CACHE_PATH.write_text(
+        json.dumps(cache, ensure_ascii=False), encoding="utf-8",
+    )
+
+
+def get(cache: dict, key: str):
+    """Вернуть сохранённое значение, если оно ещё не устарело."""
+    entry = cache.get(key)
+    if entry and time.time() - entry["ts"] < TTL:
+        return entry["value"]
+    return None
+
+
+def put(cache: dict, key: str, value) -> None:
+    """Сохранить значение с текущей меткой времени."""
+    cache[key] = {"value": value, "ts": time.time()}
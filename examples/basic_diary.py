@@ -1,6 +1,6 @@
 import asyncio
-import os
 import sys
+from _common import load_auth_env
 from netschoolpy import NetSchool
 
 
@@ -10,80 +10,74 @@ async def main():
     # 2. ESIA Login/Password (если заданы ENV)
     # 3. SGO Login/Password (если заданы ENV)
 
-    url = os.getenv("NS_URL", "https://sgo.your-region.ru")
-    
-    if "your-region.ru" in url:
+    env = load_auth_env()
+
+    if not env.has_url:
         print("❌ ОШИБКА: Не указан URL дневника (NS_URL).")
         print("Пример: export NS_URL=https://sgo.tv-obr.ru")
         return
-    
-    # SGO
-    ns_login = os.getenv("NS_LOGIN")
-    ns_password = os.getenv("NS_PASSWORD")
-    ns_school = os.getenv("NS_SCHOOL")
-    
-    # ESIA
-    esia_login = os.getenv("ESIA_LOGIN")
-    esia_password = os.getenv("ESIA_PASSWORD")
-    
+
     # Флаг для QR
     use_qr = "--qr" in sys.argv
 
-    ns = NetSchool(url)
-    
-    try:
-        if use_qr:
-            print(f"Вход через QR-код Госуслуг (URL: {url})...")
+    async with NetSchool(env.url) as ns:
+        try:
+            if use_qr:
+                print(f"Вход через QR-код Госуслуг (URL: {env.url})...")
             
-            try:
-                import qrcode
-            except ImportError:
-                print("Ошибка: Для QR-входа нужно установить qrcode: pip install qrcode")
-                return
+                try:
+                    import qrcode
+                except ImportError:
+                    print("Ошибка: Для QR-входа нужно установить qrcode: pip install qrcode")
+                    return
 
-            async def qr_callback(qr_data):
-                qr = qrcode.QRCode()
-                qr.add_data(qr_data)
-                qr.print_ascii()
-                print("\n⚠️  ВАЖНО: QR-код действителен только 2 минуты!")
-                print("Отсканируйте QR-код в приложении Госуслуги -> Сканер")
+                def render_qr(qr_data):
+                    qr = qrcode.QRCode()
+                    qr.add_data(qr_data)
+                    qr.print_ascii()
 
-            await ns.login_via_gosuslugi_qr(qr_callback)
+                async def qr_callback(qr_data):
+                    # Печать QR блокирует — уводим её из event loop
+                    await asyncio.to_thread(render_qr, qr_data)
+                    print("\n⚠️  ВАЖНО: QR-код действителен только 2 минуты!")
+                    print("Отсканируйте QR-код в приложении Госуслуги -> Сканер")
+
+                await ns.login_via_gosuslugi_qr(qr_callback)
             
-        elif esia_login and esia_password:
-            print(f"Вход через Госуслуги (URL: {url})...")
-            await ns.login_via_gosuslugi(esia_login, esia_password)
+            elif env.esia_login and env.esia_password:
+                print(f"Вход через Госуслуги (URL: {env.url})...")
+                await ns.login_via_gosuslugi(env.esia_login, env.esia_password)
             
-        elif ns_login and ns_password:
-            if not ns_school:
-                print("❌ Укажите NS_SCHOOL (название школы)")
-                return
-            print(f"Вход через логин/пароль школы (URL: {url})...")
-            await ns.login(ns_login, ns_password, ns_school)
+            elif env.ns_login and env.ns_password:
+                if not env.ns_school:
+                    print("❌ Укажите NS_SCHOOL (название школы)")
+                    return
+                print(f"Вход через логин/пароль школы (URL: {env.url})...")
+                await ns.login(env.ns_login, env.ns_password, env.ns_school)
             
-        else:
-            print("❌ Не найдены данные для входа!")
-            print("1. Укажите NS_LOGIN/NS_PASSWORD (для обычного входа)")
-            print("2. Или ESIA_LOGIN/ESIA_PASSWORD (для Госуслуг)")
-            print("3. Или запустите с флагом --qr (для входа по QR)")
-            return
+            else:
+                print("❌ Не найдены данные для входа!")
+                print("1. Укажите NS_LOGIN/NS_PASSWORD (для обычного входа)")
+                print("2. Или ESIA_LOGIN/ESIA_PASSWORD (для Госуслуг)")
+                print("3. Или запустите с флагом --qr (для входа по QR)")
+                return
 
-        print("✅ Успешный вход!")
-        diary = await ns.diary()
+            print("✅ Успешный вход!")
+            diary = await ns.diary()
         
-        print("\nРасписание на неделю:")
-        for day in diary.schedule:
-            print(f"\nExample Day: {day.day}")
-            for lesson in day.lessons:
-                print(f"  {lesson.number}. {lesson.subject}")
-                for assignment in lesson.assignments:
-                    if assignment.mark:
-                        print(f"     Оценка: {assignment.mark} (вес: {assignment.weight}, тип: {assignment.kind_abbr})")
+            # Собираем вывод целиком и пишем одним вызовом
+            out = ["\nРасписание на неделю:"]
+            for day in diary.schedule:
+                out.append(f"\nExample Day: {day.day}")
+                for lesson in day.lessons:
+                    out.append(f"  {lesson.number}. {lesson.subject}")
+                    for assignment in lesson.assignments:
+                        if assignment.mark:
+                            out.append(f"     Оценка: {assignment.mark} (вес: {assignment.weight}, тип: {assignment.kind_abbr})")
+            sys.stdout.write("\n".join(out) + "\n")
 
-    except Exception as e:
-        print(f"❌ Ошибка: {e}")
-    finally:
-        await ns.close()
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
 
 
 if __name__ == "__main__":
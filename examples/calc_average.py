@@ -1,48 +1,46 @@
 import asyncio
 import datetime
-import os
+import itertools
 import sys
+from collections import defaultdict
+from _common import load_auth_env
 from netschoolpy import NetSchool
 
+
 async def main():
-    url = os.getenv("NS_URL", "https://sgo.your-region.ru")
-    
-    if "your-region.ru" in url:
+    env = load_auth_env()
+
+    if not env.has_url:
         print("❌ ОШИБКА: Не указан URL дневника (NS_URL).")
         return
 
-    # SGO
-    ns_login = os.getenv("NS_LOGIN")
-    ns_password = os.getenv("NS_PASSWORD")
-    ns_school = os.getenv("NS_SCHOOL")
-    
-    # ESIA
-    esia_login = os.getenv("ESIA_LOGIN")
-    esia_password = os.getenv("ESIA_PASSWORD")
-    
     use_qr = "--qr" in sys.argv
 
-    async with NetSchool(url) as ns:
+    # Дневник за месяц разбирается через orjson, если он установлен
+    # (pip install netschoolpy[fast])
+    async with NetSchool(env.url) as ns:
         try:
             if use_qr:
                 print("Вход через QR...")
                 try:
                     import qrcode
-                    async def qr_cb(data):
+                    def render_qr(data):
                         qr = qrcode.QRCode(); qr.add_data(data); qr.print_ascii()
+                    async def qr_cb(data):
+                        await asyncio.to_thread(render_qr, data)
                         print("\n⚠️  ВАЖНО: QR-код действителен только 1 минуту!")
                         print("Отсканируйте QR-код в приложении Госуслуги -> Сканер")
                     await ns.login_via_gosuslugi_qr(qr_cb)
                 except ImportError:
                     print("Нужен qrcode: pip install qrcode")
                     return
-            elif esia_login and esia_password:
-                await ns.login_via_gosuslugi(esia_login, esia_password)
-            elif ns_login and ns_password:
-                if not ns_school:
+            elif env.esia_login and env.esia_password:
+                await ns.login_via_gosuslugi(env.esia_login, env.esia_password)
+            elif env.ns_login and env.ns_password:
+                if not env.ns_school:
                     print("❌ Укажите NS_SCHOOL (название школы)")
                     return
-                await ns.login(ns_login, ns_password, ns_school)
+                await ns.login(env.ns_login, env.ns_password, env.ns_school)
             else:
                 print("Нет данных для входа. Используйте ENV или флаг --qr")
                 return
@@ -54,21 +52,48 @@ async def main():
 
             print(f"Считаем средний балл с {start} по {end}...")
 
-            diary = await ns.diary(start=start, end=end)
-            all_marks = []  # (mark, weight)
-            
-            for day in diary.schedule:
+            # API «Сетевого города» недельное: запрашиваем диапазон
+            # кусками по календарным неделям (с понедельника, как
+            # _week_range) параллельно и склеиваем на клиенте
+            monday = start - datetime.timedelta(days=start.weekday())
+            weeks = []
+            while monday <= end:
+                sunday = monday + datetime.timedelta(days=6)
+                weeks.append((max(start, monday), min(end, sunday)))
+                monday += datetime.timedelta(days=7)
+            diaries = await asyncio.gather(
+                *(ns.diary(start=a, end=b) for a, b in weeks)
+            )
+            schedule = list(
+                itertools.chain.from_iterable(d.schedule for d in diaries)
+            )
+
+            # Один проход: суммы копятся сразу, без списка кортежей
+            subjects_marks = defaultdict(lambda: [0, 0])  # [сумма, количество]
+            sum_m = sum_mw = sum_w = n = 0
+
+            for day in schedule:
                 for lesson in day.lessons:
+                    subject = lesson.subject
                     for assignment in lesson.assignments:
-                        if assignment.mark:
-                            all_marks.append((assignment.mark, assignment.weight))
-            
-            if all_marks:
-                simple_avg = sum(m for m, _ in all_marks) / len(all_marks)
-                weighted_sum = sum(m * w for m, w in all_marks)
-                weight_total = sum(w for _, w in all_marks)
-                weighted_avg = weighted_sum / weight_total if weight_total else 0
-                print(f"Простой средний балл: {simple_avg:.2f}")
+                        # Каждое поле читаем один раз
+                        m = assignment.mark
+                        if not m:
+                            continue
+                        w = assignment.weight
+                        acc = subjects_marks[subject]
+                        acc[0] += m
+                        acc[1] += 1
+                        sum_m += m
+                        sum_mw += m * w
+                        sum_w += w
+                        n += 1
+
+            if n:
+                for subject, (total, count) in sorted(subjects_marks.items()):
+                    print(f"  {subject}: {total / count:.2f}")
+                weighted_avg = sum_mw / sum_w if sum_w else 0
+                print(f"Простой средний балл: {sum_m / n:.2f}")
                 print(f"Средневзвешенный балл: {weighted_avg:.2f}")
             else:
                 print("Оценок нет.")
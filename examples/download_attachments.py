@@ -1,65 +1,79 @@
 import asyncio
-import os
 import sys
+from io import BytesIO
+from _common import load_auth_env
 from netschoolpy import NetSchool
 
 async def main():
-    url = os.getenv("NS_URL", "https://sgo.your-region.ru")
-    
-    if "your-region.ru" in url:
+    env = load_auth_env()
+
+    if not env.has_url:
         print("❌ ОШИБКА: Не указан URL дневника (NS_URL).")
         return
 
-    # SGO
-    ns_login = os.getenv("NS_LOGIN")
-    ns_password = os.getenv("NS_PASSWORD")
-    ns_school = os.getenv("NS_SCHOOL")
-    
-    # ESIA
-    esia_login = os.getenv("ESIA_LOGIN")
-    esia_password = os.getenv("ESIA_PASSWORD")
-    
     use_qr = "--qr" in sys.argv
 
-    async with NetSchool(url) as ns:
+    async with NetSchool(env.url) as ns:
         try:
             if use_qr:
                 print("Вход через QR...")
                 try:
                     import qrcode
-                    async def qr_cb(data):
+                    def render_qr(data):
                         qr = qrcode.QRCode(); qr.add_data(data); qr.print_ascii()
+                    async def qr_cb(data):
+                        await asyncio.to_thread(render_qr, data)
                         print("\n⚠️  ВАЖНО: QR-код действителен только 1 минуту!")
                         print("Отсканируйте QR-код в приложении Госуслуги -> Сканер")
                     await ns.login_via_gosuslugi_qr(qr_cb)
                 except ImportError:
                     print("pip install qrcode")
                     return
-            elif esia_login and esia_password:
-                await ns.login_via_gosuslugi(esia_login, esia_password)
-            elif ns_login and ns_password:
-                if not ns_school:
+            elif env.esia_login and env.esia_password:
+                await ns.login_via_gosuslugi(env.esia_login, env.esia_password)
+            elif env.ns_login and env.ns_password:
+                if not env.ns_school:
                     print("❌ Укажите NS_SCHOOL (название школы)")
                     return
-                await ns.login(ns_login, ns_password, ns_school)
+                await ns.login(env.ns_login, env.ns_password, env.ns_school)
             else:
                 print("Нет данных (ENV NS_LOGIN/ESIA_LOGIN или --qr)")
                 return
 
             diary = await ns.diary()
             print("Поиск вложений...")
-            found = False
+            # Сначала собираем все вложения, потом качаем их параллельно
+            atts = []
             for day in diary.schedule:
                 for lesson in day.lessons:
                     for assignment in lesson.assignments:
                         if assignment.attachments:
-                            found = True
                             print(f"\nНайдено вложение по предмету: {lesson.subject} ({assignment.kind})")
                             for attachment in assignment.attachments:
                                 print(f"  - {attachment.name} (ID: {attachment.id})")
+                                atts.append(attachment)
 
-            if not found:
+            if not atts:
                 print("Вложений не найдено")
+                return
+
+            sem = asyncio.Semaphore(8)
+
+            async def download(att):
+                buf = BytesIO()
+                async with sem:
+                    await ns.download_attachment(att.id, buf)
+                return buf
+
+            results = await asyncio.gather(
+                *(download(a) for a in atts), return_exceptions=True,
+            )
+            print("\nСкачивание:")
+            for att, res in zip(atts, results, strict=True):
+                if isinstance(res, Exception):
+                    print(f"  - {att.name}: ошибка ({res})")
+                else:
+                    print(f"  - {att.name}: {len(res.getvalue())} байт")
         except Exception as e:
             print(f"Ошибка: {e}")
 
@@ -1,18 +1,38 @@
 import asyncio
 import os
-from netschoolpy import NetSchool
+import pathlib
+from netschoolpy import NetSchool, SessionExpired
+
+# Сюда сохраняется сессия после входа — повторный запуск
+# не проходит всю цепочку редиректов ESIA заново
+SESSION_FILE = pathlib.Path(
+    os.getenv("NS_SESSION_FILE", "~/.cache/netschoolpy/esia_session.json")
+).expanduser()
 
 
 async def main():
     # Настройки
     url = os.getenv("NS_URL", "https://sgo.your-region.ru")
-    
+
     # Логин и пароль от Госуслуг
     esia_login = os.getenv("ESIA_LOGIN", "79000000000")
     esia_password = os.getenv("ESIA_PASSWORD", "gosuslugi_pass")
 
-    async with NetSchool(url) as ns:
-        try:
+    ns = NetSchool(url)
+    try:
+        restored = False
+        if SESSION_FILE.exists():
+            try:
+                await ns.import_session(SESSION_FILE.read_text())
+                restored = True
+                print("Сессия восстановлена из файла.")
+            except SessionExpired:
+                print("Сохранённая сессия истекла, входим заново...")
+            except (ValueError, KeyError):
+                # Файл повреждён или обрезан — просто входим заново
+                print("Файл сессии повреждён, входим заново...")
+
+        if not restored:
             print("Вход через Госуслуги (ESIA)...")
 
             # Метод login_via_gosuslugi проходит полный цикл авторизации.
@@ -21,11 +41,26 @@ async def main():
 
             print("Успешный вход через ESIA!")
 
-            diary = await ns.diary()
-            print(f"Дневник получен. Уроков на неделе: {sum(len(d.lessons) for d in diary.schedule)}")
+            # Файл содержит токен доступа — создаём его сразу с правами
+            # только для владельца, без окна между записью и chmod
+            SESSION_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(
+                SESSION_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600,
+            )
+            if hasattr(os, "fchmod"):
+                # файл от прошлого запуска мог остаться с правами 0644
+                os.fchmod(fd, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(ns.export_session())
+
+        diary = await ns.diary()
+        print(f"Дневник получен. Уроков на неделе: {sum(len(d.lessons) for d in diary.schedule)}")
 
-        except Exception as e:
-            print(f"Ошибка входа: {e}")
+    except Exception as e:
+        print(f"Ошибка входа: {e}")
+    finally:
+        # Без logout: сохранённая сессия должна остаться живой
+        await ns.close(logout=False)
 
 
 if __name__ == "__main__":
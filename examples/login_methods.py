@@ -5,8 +5,11 @@
 """
 
 import asyncio
+from dataclasses import asdict
 
-from netschoolpy import get_login_methods, get_url, list_regions
+import _probe_cache
+
+from netschoolpy import REGIONS, LoginMethods, get_login_methods
 
 
 async def main():
@@ -28,15 +31,29 @@ async def main():
     print(f"  → {methods.summary}")
     print()
 
-    # ── 3. Проверить все регионы ───────────────────────────
+    # ── 3. Проверить все регионы (параллельно) ─────────────
     print("=== Все регионы ===")
-    for region in list_regions():
-        url = get_url(region)
-        if url is None:
-            continue
-        try:
+    urls = [(r, u) for r, u in REGIONS.items() if u]
+
+    # Ограничиваем число одновременных подключений
+    sem = asyncio.Semaphore(32)
+    cache = _probe_cache.load()
+
+    async def probe(url):
+        cached = _probe_cache.get(cache, url)
+        if cached is not None:
+            return LoginMethods(**cached)
+        async with sem:
             m = await get_login_methods(url, timeout=10)
-        except Exception:
+        _probe_cache.put(cache, url, asdict(m))
+        return m
+
+    results = await asyncio.gather(
+        *(probe(u) for _, u in urls), return_exceptions=True,
+    )
+    _probe_cache.save(cache)
+    for (region, _), m in zip(urls, results, strict=True):
+        if isinstance(m, Exception):
             print(f"  {region}: ❌ ошибка подключения")
             continue
 
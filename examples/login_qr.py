@@ -13,6 +13,12 @@ except ImportError:
 from netschoolpy import NetSchool
 
 
+def _render_qr(qr_data: str) -> None:
+    qr = qrcode.QRCode()
+    qr.add_data(qr_data)
+    qr.print_ascii()  # Вывод QR-кода прямо в терминал
+
+
 async def main():
     url = os.getenv("NS_URL", "https://sgo.your-region.ru")
     
@@ -20,9 +26,9 @@ async def main():
     # Она получает строку `qr_data`, которую нужно превратить в QR-код
     async def my_qr_callback(qr_data: str):
         print("\nГенерация QR-кода...")
-        qr = qrcode.QRCode()
-        qr.add_data(qr_data)
-        qr.print_ascii()  # Вывод QR-кода прямо в терминал
+        # Рендер синхронный — выполняем в потоке, чтобы не блокировать
+        # event loop, пока библиотека ждёт сканирования
+        await asyncio.to_thread(_render_qr, qr_data)
         print("\n⚠️  ВАЖНО: QR-код действителен только 2 минуты!")
         print("Отсканируйте этот код в мобильном приложении Госуслуги -> Сканер")
         print("(Ожидание сканирования...)\n")
@@ -1,16 +1,46 @@
 """Пример: работа с внутренней почтой — список, чтение, скачивание файлов."""
 import asyncio
-from io import BytesIO
+import os
+from pathlib import Path
 
 from netschoolpy import NetSchool
 
 
+def unique_paths(attachments):
+    """Безопасные и неповторяющиеся имена файлов для вложений.
+
+    Имя приходит с сервера: отбрасываем каталоги (в том числе
+    «..\\» из Windows-путей), а совпадающие имена нумеруем —
+    «отчёт.pdf», «отчёт (1).pdf», ...
+    """
+    taken = set()
+    paths = []
+    for att in attachments:
+        name = Path(att.name.replace("\\", "/")).name
+        if name in ("", ".", ".."):
+            name = f"attachment-{att.id}"
+        path = Path(name)
+        n = 0
+        while path in taken or path.exists():
+            n += 1
+            path = Path(f"{Path(name).stem} ({n}){Path(name).suffix}")
+        taken.add(path)
+        paths.append(path)
+    return paths
+
+
 async def main():
     async with NetSchool("https://sgo.example.ru") as ns:
         await ns.login("student_login", "password", "School Name")
 
+        # Входящие и отправленные независимы — запрашиваем одновременно
+        inbox_task = asyncio.create_task(
+            ns.mail_list("Inbox", page=1, page_size=20)
+        )
+        sent_task = asyncio.create_task(ns.mail_list("Sent"))
+
         # Список входящих писем (первая страница)
-        page = await ns.mail_list("Inbox", page=1, page_size=20)
+        page = await inbox_task
         print(f"Всего писем: {page.total_items}")
 
         for entry in page.entries:
@@ -23,16 +53,24 @@ async def main():
             print(f"От: {msg.author_name}")
             print(f"Текст: {msg.text}")
 
-            # Скачать вложения
-            for att in msg.file_attachments:
-                buf = BytesIO()
-                await ns.download_attachment(att.id, buf)
-                with open(att.name, "wb") as f:
-                    f.write(buf.getvalue())
-                print(f"Скачан: {att.name} ({len(buf.getvalue())} байт)")
+            # Скачать вложения (до 4 одновременно)
+            # Пишем сразу в файл — без промежуточного BytesIO
+            sem = asyncio.Semaphore(4)
+
+            async def download(att, path):
+                async with sem:
+                    with open(path, "wb") as f:
+                        await ns.download_attachment(att.id, f)
+                print(f"Скачан: {path} ({os.path.getsize(path)} байт)")
+
+            attachments = msg.file_attachments
+            await asyncio.gather(*(
+                download(a, p)
+                for a, p in zip(attachments, unique_paths(attachments), strict=True)
+            ))
 
         # Отправленные
-        sent = await ns.mail_list("Sent")
+        sent = await sent_task
         print(f"\nОтправленных: {sent.total_items}")
 
 
@@ -5,35 +5,66 @@
 """
 
 import asyncio
+from dataclasses import asdict
 
-from netschoolpy import search_schools, get_url, list_regions
+import _probe_cache
+
+from netschoolpy import REGIONS, search_schools
+from netschoolpy.http import HttpSession
+from netschoolpy.models import ShortSchool
 
 
 async def main():
-    # ── 1. Поиск по прямому URL сервера ────────────────────
-    print("=== Поиск по URL ===")
-    schools = await search_schools(
-        "https://sgo.e-mordovia.ru",
-        "Лицей",
-    )
-    for s in schools:
-        print(f"  [{s.id}] {s.short_name} — {s.name}")
-
-    # ── 2. Поиск по имени региона ──────────────────────────
-    print("\n=== Поиск по имени региона ===")
-    schools = await search_schools("Республика Мордовия", "Лицей")
-    for s in schools:
-        print(f"  [{s.id}] {s.short_name} — {s.name}")
-
-    # ── 3. Поиск по всем регионам ──────────────────────────
+    # Один сервер — одна сессия: запросы ниже идут
+    # по уже установленному TLS-соединению.
+    session = HttpSession("https://sgo.e-mordovia.ru")
+    try:
+        # ── 1. Поиск по прямому URL сервера ────────────────
+        print("=== Поиск по URL ===")
+        schools = await search_schools(
+            "https://sgo.e-mordovia.ru",
+            "Лицей",
+            session=session,
+        )
+        for s in schools:
+            print(f"  [{s.id}] {s.short_name} — {s.name}")
+
+        # ── 2. Поиск по имени региона ──────────────────────
+        print("\n=== Поиск по имени региона ===")
+        schools = await search_schools(
+            "Республика Мордовия", "Лицей", session=session,
+        )
+        for s in schools:
+            print(f"  [{s.id}] {s.short_name} — {s.name}")
+    finally:
+        await session.close()
+
+    # ── 3. Поиск по всем регионам (параллельно) ────────────
     print("\n=== Поиск «Лицей №1» по всем регионам ===")
-    for region in list_regions():
-        url = get_url(region)
-        if url is None:
-            continue
-        try:
-            results = await search_schools(url, "Лицей №1", timeout=10)
-        except Exception:
+    urls = [(r, u) for r, u in REGIONS.items() if u]
+
+    # Ограничиваем число одновременных подключений
+    sem = asyncio.Semaphore(16)
+    cache = _probe_cache.load()
+
+    async def search(region, url):
+        key = f"{url}|Лицей №1"
+        cached = _probe_cache.get(cache, key)
+        if cached is not None:
+            return region, url, [ShortSchool(**s) for s in cached]
+        async with sem:
+            try:
+                results = await search_schools(url, "Лицей №1", timeout=10)
+            except Exception:
+                return region, url, None
+        _probe_cache.put(cache, key, [asdict(s) for s in results])
+        return region, url, results
+
+    # Печатаем результаты по мере готовности — быстрые регионы
+    # не ждут самого медленного
+    for fut in asyncio.as_completed([search(r, u) for r, u in urls]):
+        region, url, results = await fut
+        if results is None:
             print(f"  {region}: ошибка подключения")
             continue
 
@@ -41,6 +72,43 @@ async def main():
             print(f"  {region} ({url}):")
             for s in results:
                 print(f"    [{s.id}] {s.short_name}")
+    _probe_cache.save(cache)
+
+    # ── 4. Первый регион, где школа нашлась ────────────────
+    print("\n=== Первый регион с «Лицей №1» ===")
+    hit = await find_first(urls, "Лицей №1")
+    if hit:
+        region, results = hit
+        print(f"  {region}: {', '.join(s.short_name for s in results)}")
+    else:
+        print("  нигде не найдено")
+
+
+async def find_first(urls, query, concurrency=16):
+    """Вернуть первый непустой результат, отменив остальные запросы."""
+    # Как и в поиске выше — не больше concurrency подключений сразу
+    sem = asyncio.Semaphore(concurrency)
+
+    async def search(url):
+        async with sem:
+            return await search_schools(url, query, timeout=10)
+
+    pending = {asyncio.create_task(search(u), name=r) for r, u in urls}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    if task.result():
+                        return task.get_name(), task.result()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        # Дожидаемся отмены, чтобы запросы закрылись до остановки цикла
+        await asyncio.gather(*pending, return_exceptions=True)
 
 
 if __name__ == "__main__":
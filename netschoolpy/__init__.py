@@ -1,6 +1,12 @@
 """netschoolpy — асинхронный клиент для «Сетевого города»."""
 
-from .client import NetSchool, get_login_methods, search_schools
+from .client import (
+    NetSchool,
+    get_login_methods,
+    get_login_methods_multi,
+    search_schools,
+    search_schools_multi,
+)
 from .exceptions import (
     ESIAError,
     LoginError,
@@ -10,6 +16,7 @@ from .exceptions import (
     ServerUnavailable,
     SessionExpired,
 )
+from .http import FAST_PROBE_TIMEOUT, HttpSession
 from .models import LoginMethods
 from .regions import REGIONS, get_url, list_regions
 
@@ -19,6 +26,10 @@ __all__ = [
     "NetSchool",
     "search_schools",
     "get_login_methods",
+    "search_schools_multi",
+    "get_login_methods_multi",
+    "HttpSession",
+    "FAST_PROBE_TIMEOUT",
     "LoginMethods",
     "NetSchoolError",
     "LoginError",
@@ -3,23 +3,31 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
 import re
 import ssl as _ssl
+import time
 from datetime import date, timedelta
 from hashlib import md5
-from io import BytesIO
-from typing import Any, Dict, List, Optional, Union
-from urllib.parse import urljoin
+from types import MappingProxyType
+from typing import Any, BinaryIO, Callable, Dict, List, Mapping, Optional, Union
+from urllib.parse import urlencode
 
 import httpx
 
 from netschoolpy import exceptions
-from netschoolpy.http import HttpSession
+from netschoolpy.http import (
+    FAST_PROBE_TIMEOUT,
+    HttpSession,
+    _json_dumps,
+    _json_loads,
+)
 from netschoolpy.models import (
     Announcement,
     Assignment,
+    AssignmentType,
     Attachment,
     Diary,
     LoginMethods,
@@ -30,8 +38,21 @@ from netschoolpy.models import (
     School,
     ShortSchool,
 )
-
-__all__ = ["NetSchool", "search_schools", "get_login_methods"]
+from netschoolpy.regions import get_url
+
+try:
+    # Опционально: pip install netschoolpy[qr]
+    import qrcode as _qrcode
+except ImportError:  # pragma: no cover - qrcode не установлен
+    _qrcode = None
+
+__all__ = [
+    "NetSchool",
+    "search_schools",
+    "get_login_methods",
+    "search_schools_multi",
+    "get_login_methods_multi",
+]
 
 log = logging.getLogger(__name__)
 
@@ -47,6 +68,156 @@ _ESIA_API_HEADERS: dict[str, str] = {
     "referer": "https://esia.gosuslugi.ru/login/",
 }
 
+_LOGIN_STATE_RE = re.compile(r"loginState=([a-f0-9-]+)")
+
+# Голое значение NSSESSIONID (32 hex-символа) вместо строки Cookie
+_HEX32_RE = re.compile(r"[0-9a-fA-F]{32}")
+
+# Ключи, под которыми ESIA отдаёт redirect_url (в корне ответа или в "data")
+_REDIRECT_KEYS = ("redirect_url", "redirectUrl", "redirectURL", "url", "redirect")
+
+# Пропускаемые шаги ESIA после входа: action → эндпоинт skip
+_ESIA_SKIP_ENDPOINTS = {
+    "MAX_QUIZ": "quiz-max/skip",
+    "CHANGE_PASSWORD": "change-password/skip",
+}
+
+# Расшифровка кода ``failed`` из ответа ESIA на логин/пароль
+_ESIA_LOGIN_ERRORS = MappingProxyType({
+    "INVALID_PASSWORD": "Неверный пароль",
+    "INVALID_LOGIN": "Неверный логин",
+    "ACCOUNT_LOCKED": "Аккаунт заблокирован",
+    "ACCOUNT_NOT_FOUND": "Аккаунт не найден",
+    "CAPTCHA_REQUIRED": "Требуется captcha (слишком много попыток)",
+})
+
+# Сколько секунд close(graceful=False) ждёт ответа на auth/logout
+_FAST_LOGOUT_TIMEOUT = 2
+
+# Одновременных API-запросов на один клиент по умолчанию
+_DEFAULT_MAX_INFLIGHT = 50
+
+# Пути проверки кода для известных типов MFA (относительно .../api/login)
+_MFA_VERIFY_PATHS = MappingProxyType({
+    "TOTP": "/mfa/verify",
+    "SMS": "/otp/verify",
+    "MAX": "/otp-max/verify",
+})
+
+# Найденные перебором endpoint'ы проверки кода для нестандартных типов MFA
+_MFA_VERIFY_URLS: dict[str, str] = {}
+
+# Коды ошибок SSE, означающие, что QR-сессия истекла
+_QR_EXPIRED_CODES = frozenset({
+    "QR_AUTHORIZATION_SESSION_EXPIRED",
+    "QR_CODE_SESSION_NOT_FOUND",
+    "QR_CODE_SESSION_OUTDATED",
+})
+
+# Папки почты → подписи для фильтра mail/registry
+_MAIL_FOLDER_LABELS = MappingProxyType({
+    "Inbox": "Входящие",
+    "Sent": "Отправленные",
+    "Draft": "Черновики",
+    "Deleted": "Удалённые",
+})
+
+# Постоянные части тела mail/registry. Обычные dict, а не MappingProxyType:
+# json.dumps их не сериализует. Не изменять — объекты общие для всех вызовов
+_MAIL_MESSAGE_TYPE_FILTER = {
+    "filterId": "MessageType",
+    "filterValue": "All",
+    "filterText": "Все",
+}
+_MAIL_REGISTRY_FIELDS = ("author", "subject", "sent")
+_MAIL_REGISTRY_ORDER = {"fieldId": "sent", "ascending": False}
+
+# Постоянные параметры запроса mail/recipients (к ним добавляются ID)
+_RECIPIENTS_STATIC_PARAMS = MappingProxyType({
+    "funcType": 2,
+    "orgType": 1,
+    "group": 1,
+})
+
+# Постоянные поля тела mail/messages/send
+_MAIL_SEND_STATIC = MappingProxyType({
+    "cc": (),
+    "bcc": (),
+    "notify": False,
+    "fileAttachments": (),
+})
+
+# (base_url, название школы) → ID школы, см. NetSchool._resolve_school
+_SCHOOL_ID_CACHE: dict[tuple[str, str], int] = {}
+
+# (base_url, ID школы) → (срок годности по monotonic, справочник типов заданий).
+# Справочник только для чтения: он общий для всех клиентов процесса
+_ASSIGNMENT_TYPES_CACHE: dict[
+    tuple[str, int], tuple[float, Mapping[int, AssignmentType]]
+] = {}
+_ASSIGNMENT_TYPES_TTL = 24 * 60 * 60  # сутки
+
+# base_url → (срок годности по monotonic, способы входа), см. get_login_methods
+_LOGIN_METHODS_CACHE: dict[str, tuple[float, LoginMethods]] = {}
+_LOGIN_METHODS_TTL = 60 * 60  # час
+
+# Сколько секунд NetSchool.mail_recipients отдаёт список из памяти
+_RECIPIENTS_TTL = 5 * 60
+
+
+def _school_key(name: str) -> str:
+    """Нормализовать название школы для сравнения."""
+    return " ".join(name.split()).casefold()
+
+
+async def _gather_or_cancel(*aws: Any) -> list[Any]:
+    """``asyncio.gather``, который при первой ошибке отменяет остальных.
+
+    Обычный ``gather`` оставляет соседние корутины работать в фоне —
+    после неудачного входа они успели бы заполнить год, типы заданий
+    и прочее состояние клиента.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _is_esia_domain(domain: str | None) -> bool:
+    """Кука для ESIA: домен Госуслуг или без домена (продублированная)."""
+    return not domain or "esia" in domain or "gosuslugi" in domain
+
+
+@functools.lru_cache(maxsize=1)
+def _esia_ssl_context() -> _ssl.SSLContext:
+    """SSL-контекст для запросов к ESIA (esia.gosuslugi.ru).
+
+    Создаётся один раз на процесс: загрузка системных сертификатов
+    заметно дороже самого запроса.
+    """
+    ctx = _ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = _ssl.CERT_NONE
+    try:
+        ctx.set_ciphers("DEFAULT:@SECLEVEL=1")
+    except _ssl.SSLError:
+        pass
+    ctx.options |= _ssl.OP_NO_TLSv1_3
+    return ctx
+
+
+@functools.lru_cache(maxsize=1)
+def _esia_sse_ssl_context() -> _ssl.SSLContext:
+    """SSL-контекст для raw SSE-сокета ESIA QR."""
+    ctx = _ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = _ssl.CERT_NONE
+    return ctx
+
 
 class NetSchool:
     """Асинхронный клиент для API «Сетевого города».
@@ -58,8 +229,36 @@ class NetSchool:
             diary = await ns.diary()
     """
 
+    __slots__ = (
+        "_http",
+        "_owns_http",
+        "_gosuslugi_url",
+        "_student_id",
+        "_user_params",
+        "_year_id",
+        "_school_id",
+        "_assignment_types",
+        "_credentials",
+        "_access_token",
+        "_keepalive_task",
+        "_keepalive_interval",
+        "_keepalive_adaptive",
+        "_warm_interval",
+        "_esia_client",
+        "_inflight",
+        "_relogin_lock",
+        "_session_generation",
+        "_mail_reads",
+        "_recipients_cache",
+        "__weakref__",
+    )
+
     def __init__(self, url: str, *, timeout: int | None = None,
-                 proxy: str | None = None):
+                 proxy: str | None = None,
+                 json_loads: Callable[[bytes], Any] | None = None,
+                 limits: httpx.Limits | None = None,
+                 http2: bool = False,
+                 session: HttpSession | None = None):
         """
         :param url: URL сервера Сетевой Город.
         :param timeout: Таймаут HTTP-запросов в секундах.
@@ -67,19 +266,63 @@ class NetSchool:
             ``socks5://127.0.0.1:1080``. Полезно для серверов, которые
             блокируют datacenter IP (можно использовать с VLESS/xray).
             При указании Tor-fallback не применяется.
+        :param json_loads: Функция разбора JSON для больших ответов
+            (дневник, задания, объявления, почта). По умолчанию —
+            ``orjson.loads``, если orjson установлен, иначе ``json.loads``.
+        :param limits: ``httpx.Limits`` пула соединений SGO. По умолчанию
+            до 100 соединений, 20 простаивающих держатся 15 секунд.
+        :param http2: Использовать HTTP/2 для запросов к SGO (нужен
+            пакет ``h2``: ``pip install netschoolpy[http2]``).
+        :param session: Готовая :class:`HttpSession` для этого сервера —
+            например, та же, что передавалась в :func:`search_schools`
+            и :func:`get_login_methods`: вход пойдёт по уже открытому
+            соединению. Такая сессия не закрывается в :meth:`close`;
+            ``timeout``, ``proxy``, ``json_loads``, ``limits`` и ``http2``
+            при этом не применяются.
         """
-        self._http = HttpSession(url, timeout=timeout, proxy=proxy)
+        self._owns_http = session is None
+        self._http = session if session is not None else HttpSession(
+            url, timeout=timeout, proxy=proxy, json_loads=json_loads,
+            limits=limits, http2=http2,
+        )
+        # base_url сессии не меняется — ссылку собираем один раз
+        self._gosuslugi_url = f"{self._http.base_url}/sso/esia/crosslogin"
 
         self._student_id: int = -1
+        # userId=<ученик> — общий параметр почтовых запросов,
+        # кодируется один раз при выборе ученика (_assign_student)
+        self._user_params = httpx.QueryParams({"userId": -1})
         self._year_id: int = -1
         self._school_id: int = -1
 
-        self._assignment_types: Dict[int, dict] = {}
+        self._assignment_types: Mapping[int, AssignmentType] = {}
         self._credentials: tuple = ()
         self._access_token: Optional[str] = None
 
         self._keepalive_task: Optional[asyncio.Task] = None
         self._keepalive_interval: int = 300  # 5 мин
+        # Подстраивать интервал под срок жизни NSSESSIONID
+        # (выключается явным set_keepalive_interval)
+        self._keepalive_adaptive: bool = True
+        # Прогрев соединения между пингами keep-alive (0 — выключен,
+        # см. set_connection_warming)
+        self._warm_interval: float = 0
+
+        # Клиент для ESIA создаётся лениво и переиспользуется между входами
+        self._esia_client: Optional[httpx.AsyncClient] = None
+
+        # Ограничение одновременных API-запросов (см. set_max_inflight)
+        self._inflight = asyncio.Semaphore(_DEFAULT_MAX_INFLIGHT)
+        # Переавторизация после 401 выполняется одним запросом за раз;
+        # поколение сессии растёт с каждым успешным повторным входом
+        self._relogin_lock = asyncio.Lock()
+        self._session_generation: int = 0
+        # Выполняющиеся mail_read: ID письма → задача запроса
+        self._mail_reads: Dict[int, asyncio.Future[Message]] = {}
+        # (срок годности, (ученик, школа), получатели) — см. mail_recipients
+        self._recipients_cache: Optional[
+            tuple[float, tuple[int, int], List[MailRecipient]]
+        ] = None
 
     def __repr__(self) -> str:
         return (
@@ -108,18 +351,44 @@ class NetSchool:
         timeout: int | None = None,
     ) -> None:
         """Вход по логину/паролю «Сетевого города»."""
+        # MD5 здесь — протокол SGO, а не защита: usedforsecurity=False
+        # не даёт FIPS-сборкам OpenSSL отказать в алгоритме
+        pw_hash = md5(
+            password.encode("windows-1251"), usedforsecurity=False,
+        ).hexdigest().encode()
+        await self._login_hashed(
+            user_name, pw_hash, len(password), school, timeout=timeout,
+        )
+
+    async def _relogin(self, *, timeout: int | None = None) -> None:
+        """Повторный вход по сохранённым (уже хешированным) учётным данным."""
+        await self._login_hashed(*self._credentials, timeout=timeout)
+
+    async def _login_hashed(
+        self,
+        user_name: str,
+        pw_hash: bytes,
+        pw_len: int,
+        school: Union[int, str],
+        *,
+        timeout: int | None = None,
+    ) -> None:
+        """Вход по md5-хешу пароля (первый шаг хеширования не зависит от salt).
+
+        Сам пароль в памяти не хранится — для переавторизации
+        достаточно хеша и длины.
+        """
 
         # Получаем cookie NSSESSIONID
         await self._http.get("logindata", timeout=timeout)
 
         # Получаем salt для хеширования
         resp = await self._http.post("auth/getdata", timeout=timeout)
-        meta = resp.json()
+        meta = self._http.parse_json(resp)
         salt = meta.pop("salt")
 
-        pw_hash = md5(password.encode("windows-1251")).hexdigest().encode()
-        pw2 = md5(salt.encode() + pw_hash).hexdigest()
-        pw = pw2[: len(password)]
+        pw2 = md5(salt.encode() + pw_hash, usedforsecurity=False).hexdigest()
+        pw = pw2[:pw_len]
 
         school_id = (
             await self._resolve_school(school, timeout=timeout)
@@ -143,6 +412,7 @@ class NetSchool:
             )
         except httpx.HTTPStatusError as exc:
             if exc.response.status_code == httpx.codes.CONFLICT:
+                self._forget_school(school)
                 try:
                     body = exc.response.json()
                 except Exception:
@@ -152,51 +422,81 @@ class NetSchool:
                 ) from None
             raise
 
-        result = resp.json()
+        result = self._http.parse_json(resp)
         if "at" not in result:
+            self._forget_school(school)
             raise exceptions.LoginError(result.get("message", "Нет токена"))
 
         self._access_token = result["at"]
         self._http.set_header("at", result["at"])
 
+        # diary/init, year и типы заданий друг от друга не зависят
+        init_resp, year_resp, _ = await _gather_or_cancel(
+            self._http.get("student/diary/init", timeout=timeout),
+            self._http.get("years/current", timeout=timeout),
+            self._load_assignment_types(timeout=timeout),
+        )
+
         # diary/init → student
-        resp = await self._http.get("student/diary/init", timeout=timeout)
-        info = resp.json()
-        student = info["students"][info["currentStudentId"]]
-        self._student_id = student["studentId"]
+        info = self._http.parse_json(init_resp)
+        self._assign_student(info)
 
         # year
-        resp = await self._http.get("years/current", timeout=timeout)
-        self._year_id = resp.json()["id"]
+        self._year_id = self._http.parse_json(year_resp)["id"]
 
-        # assignment types (name + abbreviation)
-        resp = await self._http.get(
-            "grade/assignment/types", params={"all": False}, timeout=timeout,
-        )
-        self._assignment_types = {
-            a["id"]: {"name": a["name"], "abbr": a.get("abbr", "")}
-            for a in resp.json()
-        }
-
-        self._credentials = (user_name, password, school)
+        self._credentials = (user_name, pw_hash, pw_len, school)
         self._start_keepalive()
 
     # ═══════════════════════════════════════════════════════════
     #  ESIA: общие хелперы
     # ═══════════════════════════════════════════════════════════
 
+    def _get_esia_client(self, timeout: int | None = None) -> httpx.AsyncClient:
+        """Общий HTTP-клиент для ESIA (keep-alive между запросами и входами).
+
+        Куки очищаются при каждом вызове — каждый вход начинается
+        с чистой ESIA-сессии.
+        """
+        if self._esia_client is None or self._esia_client.is_closed:
+            self._esia_client = httpx.AsyncClient(
+                headers={"user-agent": _ESIA_USER_AGENT},
+                follow_redirects=False,
+                verify=_esia_ssl_context(),
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0,
+                ),
+                timeout=timeout or 30,
+            )
+        else:
+            self._esia_client.timeout = httpx.Timeout(timeout or 30)
+            self._esia_client.cookies.clear()
+        return self._esia_client
+
+    async def _close_esia_client(self) -> None:
+        if self._esia_client is not None:
+            client, self._esia_client = self._esia_client, None
+            await client.aclose()
+
     @staticmethod
-    def _create_esia_ssl_context() -> _ssl.SSLContext:
-        """SSL-контекст для запросов к ESIA (esia.gosuslugi.ru)."""
-        ctx = _ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = _ssl.CERT_NONE
-        try:
-            ctx.set_ciphers("DEFAULT:@SECLEVEL=1")
-        except _ssl.SSLError:
-            pass
-        ctx.options |= _ssl.OP_NO_TLSv1_3
-        return ctx
+    def _mirror_set_cookies(
+        esia_client: httpx.AsyncClient, response: httpx.Response,
+    ) -> None:
+        """Продублировать ``set-cookie`` ответа в jar без привязки к домену.
+
+        httpx сам сохраняет куки с доменом ответа, но SGO-куки
+        (NSSESSIONID и т.п.) нужны и на других хостах цепочки, а в
+        ``_esia_finalize_login`` переносятся как раз куки без домена.
+        """
+        headers = response.headers.get_list("set-cookie")
+        if not headers:
+            return
+        jar = esia_client.cookies
+        for h in headers:
+            name, sep, value = h.partition(";")[0].partition("=")
+            if sep:
+                jar.set(name.strip(), value.strip())
 
     async def _esia_crosslogin(
         self,
@@ -210,47 +510,101 @@ class NetSchool:
         await esia_client.get(f"{sgo_origin}/webapi/logindata")
 
         url = f"{sgo_origin}/webapi/sso/esia/crosslogin"
-        for _ in range(20):
-            try:
-                r = await esia_client.get(url)
-            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
-                raise exceptions.ESIAError(
-                    f"Не удалось подключиться при переходе на Госуслуги "
-                    f"(URL: {url}): {exc}"
-                ) from exc
-            for h in r.headers.get_list("set-cookie"):
-                p = h.split(";")[0].split("=", 1)
-                if len(p) == 2:
-                    esia_client.cookies.set(p[0].strip(), p[1].strip())
-            if r.status_code in (301, 302, 303, 307, 308):
-                loc = r.headers.get("location", "")
-                if not loc.startswith("http"):
-                    loc = urljoin(str(r.url), loc)
-                url = loc
-            else:
-                break
+        try:
+            r = await self._esia_follow(esia_client, url)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
+            raise exceptions.ESIAError(
+                f"Не удалось подключиться при переходе на Госуслуги "
+                f"(URL: {exc.request.url}): {exc}"
+            ) from exc
+        return str(r.url)
 
-        return url
+    async def _esia_open_login_page(
+        self,
+        esia_client: httpx.AsyncClient,
+        sgo_origin: str,
+    ) -> None:
+        """Crosslogin с проверкой, что цепочка привела на ESIA."""
+        url = await self._esia_crosslogin(esia_client, sgo_origin)
+        if "esia.gosuslugi.ru" not in url:
+            raise exceptions.ESIAError(
+                f"Не удалось добраться до страницы ESIA. "
+                f"Финальный URL: {url}"
+            )
 
-    @staticmethod
-    def _extract_redirect_url(login_data: dict) -> str | None:
-        """Извлечь ``redirect_url`` из ответа ESIA (проверяя разные ключи)."""
-        redirect_url = login_data.get("redirect_url")
+    async def _complete_esia_login(
+        self,
+        esia_client: httpx.AsyncClient,
+        sgo_origin: str,
+        login_data: dict,
+        school: str | None,
+        *,
+        otp_callback=None,
+        timeout: int | None = None,
+    ) -> None:
+        """Общая часть входа через ESIA после логина/пароля или QR.
+
+        Ответ ESIA (MFA и т.д.) → callback chain → ``loginState`` →
+        account-info → IDP-логин → сессия SGO.
+        """
+        redirect_url = await self._esia_resolve_login_response(
+            esia_client, login_data, otp_callback=otp_callback,
+        )
         if not redirect_url:
-            redirect_url = (
-                login_data.get("redirectUrl")
-                or login_data.get("redirectURL")
-                or login_data.get("url")
-                or login_data.get("redirect")
+            raise exceptions.ESIAError(
+                f"Не удалось получить redirect_url от ESIA: "
+                f"{str(login_data)[:300]}"
             )
-        if not redirect_url and isinstance(login_data.get("data"), dict):
-            redirect_url = (
-                login_data["data"].get("redirect_url")
-                or login_data["data"].get("redirectUrl")
-                or login_data["data"].get("redirectURL")
-                or login_data["data"].get("url")
+
+        login_state = await self._esia_callback_to_login_state(
+            esia_client, redirect_url,
+        )
+        await self._esia_finalize_login(
+            esia_client, sgo_origin, login_state, school, timeout=timeout,
+        )
+
+    async def _esia_follow(
+        self, esia_client: httpx.AsyncClient, url: str,
+    ) -> httpx.Response:
+        """GET с переходом по редиректам.
+
+        После каждого шага ``set-cookie`` зеркалируется в jar (см.
+        :meth:`_mirror_set_cookies`), и только затем строится следующий
+        запрос — он уже несёт продублированные куки. Редиректы
+        проходятся вручную, а не через общий response-хук клиента:
+        параллельные цепочки не видят чужих хуков.
+        """
+        request = esia_client.build_request("GET", url)
+        history: list[httpx.Response] = []
+        while True:
+            response = await esia_client.send(request)
+            self._mirror_set_cookies(esia_client, response)
+            response.history = list(history)
+            if response.next_request is None:
+                return response
+            history.append(response)
+            if len(history) > esia_client.max_redirects:
+                raise exceptions.ESIAError(
+                    f"Слишком много редиректов при переходе на Госуслуги "
+                    f"(URL: {url})"
+                )
+            # next_request собран httpx до зеркалирования — его куки
+            # устарели, поэтому запрос строится заново из jar клиента
+            request = esia_client.build_request(
+                response.next_request.method, response.next_request.url,
             )
-        return redirect_url
+
+    @staticmethod
+    def _extract_redirect_url(login_data: dict) -> str | None:
+        """Извлечь ``redirect_url`` из ответа ESIA (проверяя разные ключи)."""
+        for source in (login_data, login_data.get("data")):
+            if not isinstance(source, dict):
+                continue
+            for key in _REDIRECT_KEYS:
+                redirect_url = source.get(key)
+                if redirect_url:
+                    return redirect_url
+        return None
 
     async def _esia_resolve_login_response(
         self,
@@ -291,27 +645,18 @@ class NetSchool:
         redirect_url: str,
     ) -> str:
         """Пройти callback chain и извлечь ``loginState``."""
+        r = await self._esia_follow(esia_client, redirect_url)
+
+        # loginState может мелькнуть на любом шаге — берём последний
         login_state = None
-        url = redirect_url
-        for _ in range(15):
-            r = await esia_client.get(url)
-            for h in r.headers.get_list("set-cookie"):
-                p = h.split(";")[0].split("=", 1)
-                if len(p) == 2:
-                    esia_client.cookies.set(p[0].strip(), p[1].strip())
-            m = re.search(
-                r"loginState=([a-f0-9-]+)",
-                str(r.url) + r.headers.get("location", ""),
+        for step in (*r.history, r):
+            # URL и location проверяем по отдельности, без склейки строк
+            m = (
+                _LOGIN_STATE_RE.search(str(step.url))
+                or _LOGIN_STATE_RE.search(step.headers.get("location", ""))
             )
             if m:
                 login_state = m.group(1)
-            if r.status_code in (301, 302, 303, 307, 308):
-                loc = r.headers.get("location", "")
-                if not loc.startswith("http"):
-                    loc = urljoin(str(r.url), loc)
-                url = loc
-            else:
-                break
 
         if not login_state:
             raise exceptions.ESIAError(
@@ -343,7 +688,7 @@ class NetSchool:
                 f"{r.status_code} {r.text[:200]}"
             )
 
-        account_info = r.json()
+        account_info = _json_loads(r.content)
         users = account_info.get("users", [])
         if not users:
             raise exceptions.LoginError(
@@ -368,7 +713,8 @@ class NetSchool:
 
         r = await esia_client.post(
             f"{sgo_origin}/webapi/auth/login",
-            data=auth_params,
+            # тело кодируем сами: заголовок с charset уже задан явно
+            content=urlencode(auth_params).encode("ascii"),
             headers={
                 "Content-Type":
                     "application/x-www-form-urlencoded; charset=UTF-8",
@@ -380,7 +726,7 @@ class NetSchool:
                 f"{r.status_code} {r.text[:300]}"
             )
 
-        auth_result = r.json()
+        auth_result = _json_loads(r.content)
         at = auth_result.get("at", "")
         if not at:
             raise exceptions.LoginError("SGO не вернул access token (at)")
@@ -389,28 +735,45 @@ class NetSchool:
         self._access_token = at
         self._http.set_header("at", at)
 
-        for cookie in esia_client.cookies.jar:
-            if "sgo" in (cookie.domain or "") or not cookie.domain:
-                self._http.set_cookie(cookie.name, cookie.value)
-
-        # === Инициализация SGO ===
-        resp = await self._http.get("student/diary/init", timeout=timeout)
-        info = resp.json()
-        student = info["students"][info["currentStudentId"]]
-        self._student_id = student["studentId"]
+        self._http.update_cookies(
+            (cookie.name, cookie.value)
+            for cookie in esia_client.cookies.jar
+            if not cookie.domain or "sgo" in cookie.domain
+        )
 
-        await self._finish_login(timeout=timeout)
+        # === Инициализация SGO (diary/init параллельно с годом и типами) ===
+        resp, _ = await _gather_or_cancel(
+            self._http.get("student/diary/init", timeout=timeout),
+            self._finish_login(timeout=timeout),
+        )
+        info = self._http.parse_json(resp)
+        self._assign_student(info)
         self._credentials = ()
         self._start_keepalive()
 
+    # ── цикл событий ─────────────────────────────────────────
+
+    @staticmethod
+    def install_uvloop() -> bool:
+        """Включить uvloop как политику цикла событий (если установлен).
+
+        Вызывать до ``asyncio.run()``. Возвращает ``True``, если uvloop
+        включён, и ``False``, если пакет не установлен.
+        """
+        try:
+            import uvloop
+        except ImportError:
+            return False
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        return True
+
     # ═══════════════════════════════════════════════════════════
     #  Госуслуги: URL для входа
     # ═══════════════════════════════════════════════════════════
 
     async def get_gosuslugi_auth_url(self) -> str:
         """Возвращает ссылку для входа через Госуслуги (crosslogin)."""
-        base = self._http.base_url.rstrip("/")
-        return f"{base}/sso/esia/crosslogin"
+        return self._gosuslugi_url
 
     # ═══════════════════════════════════════════════════════════
     #  Госуслуги: логин + пароль ЕСИА
@@ -456,24 +819,11 @@ class NetSchool:
             raise exceptions.LoginError("Логин и пароль не могут быть пустыми")
 
         sgo_origin = self._http.base_url.rstrip("/").rsplit("/webapi", 1)[0]
-        ctx = self._create_esia_ssl_context()
-
-        async with httpx.AsyncClient(
-            headers={"user-agent": _ESIA_USER_AGENT},
-            follow_redirects=False,
-            verify=ctx,
-            timeout=timeout or 30,
-        ) as esia_client:
+        esia_client = self._get_esia_client(timeout)
 
-          try:
+        try:
             # === ШАГ 1: crosslogin chain ===
-            url = await self._esia_crosslogin(esia_client, sgo_origin)
-
-            if "esia.gosuslugi.ru" not in url:
-                raise exceptions.ESIAError(
-                    f"Не удалось добраться до страницы ESIA. "
-                    f"Финальный URL: {url}"
-                )
+            await self._esia_open_login_page(esia_client, sgo_origin)
 
             # === ШАГ 2: логин/пароль ESIA ===
             login_resp = await esia_client.post(
@@ -482,44 +832,21 @@ class NetSchool:
                 headers=_ESIA_API_HEADERS,
             )
 
-            login_data = login_resp.json()
+            login_data = _json_loads(login_resp.content)
 
             if "failed" in login_data:
                 error_code = login_data["failed"]
-                error_messages = {
-                    "INVALID_PASSWORD": "Неверный пароль",
-                    "INVALID_LOGIN": "Неверный логин",
-                    "ACCOUNT_LOCKED": "Аккаунт заблокирован",
-                    "ACCOUNT_NOT_FOUND": "Аккаунт не найден",
-                    "CAPTCHA_REQUIRED": (
-                        "Требуется captcha (слишком много попыток)"
-                    ),
-                }
-                msg = error_messages.get(error_code, error_code)
+                msg = _ESIA_LOGIN_ERRORS.get(error_code, error_code)
                 raise exceptions.ESIAError(f"Ошибка ESIA: {msg}")
 
-            # === ШАГ 3: обработка ответа (MFA и т.д.) ===
-            redirect_url = await self._esia_resolve_login_response(
-                esia_client, login_data, otp_callback=otp_callback,
-            )
-            if not redirect_url:
-                raise exceptions.ESIAError(
-                    "Не удалось получить redirect_url от ESIA"
-                )
-
-            # === ШАГ 4: callback chain → loginState ===
-            login_state = await self._esia_callback_to_login_state(
-                esia_client, redirect_url,
-            )
-
-            # === ШАГ 5–8: account-info → IDP-логин → сессия SGO ===
-            await self._esia_finalize_login(
-                esia_client, sgo_origin, login_state, school,
-                timeout=timeout,
+            # === ШАГ 3–8: MFA → callback → IDP-логин → сессия SGO ===
+            await self._complete_esia_login(
+                esia_client, sgo_origin, login_data, school,
+                otp_callback=otp_callback, timeout=timeout,
             )
-          except exceptions.ESIAError:
+        except exceptions.ESIAError:
             raise
-          except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
             raise exceptions.ESIAError(
                 f"Не удалось подключиться к серверу Госуслуг (ESIA): {exc}"
             ) from exc
@@ -550,24 +877,11 @@ class NetSchool:
         :return: signed_token (строка для QR-кода).
         """
         sgo_origin = self._http.base_url.rstrip("/").rsplit("/webapi", 1)[0]
-        ctx = self._create_esia_ssl_context()
-
-        async with httpx.AsyncClient(
-            headers={"user-agent": _ESIA_USER_AGENT},
-            follow_redirects=False,
-            verify=ctx,
-            timeout=timeout or 30,
-        ) as esia_client:
+        esia_client = self._get_esia_client(timeout)
 
-          try:
+        try:
             # === ШАГ 1: crosslogin chain ===
-            url = await self._esia_crosslogin(esia_client, sgo_origin)
-
-            if "esia.gosuslugi.ru" not in url:
-                raise exceptions.ESIAError(
-                    f"Не удалось добраться до страницы ESIA. "
-                    f"Финальный URL: {url}"
-                )
+            await self._esia_open_login_page(esia_client, sgo_origin)
 
             # === ШАГ 2–3: QR-генерация и ожидание (с retry) ===
             max_qr_retries = 5
@@ -601,7 +915,7 @@ class NetSchool:
                         f"{qr_resp.status_code} {qr_resp.text[:300]}"
                     )
 
-                qr_data = qr_resp.json()
+                qr_data = _json_loads(qr_resp.content)
                 signed_token = qr_data.get("signed_token", "")
                 qr_id = qr_data.get("qr_id", "")
                 if not signed_token or not qr_id:
@@ -649,29 +963,14 @@ class NetSchool:
                         f"Детали ошибки: {e}"
                     )
 
-            # === ШАГ 4: обработка ответа (MFA и т.д.) ===
-            redirect_url = await self._esia_resolve_login_response(
-                esia_client, login_data, otp_callback=otp_callback,
-            )
-            if not redirect_url:
-                raise exceptions.ESIAError(
-                    f"Не удалось получить redirect_url после QR: "
-                    f"{login_data}"
-                )
-
-            # === ШАГ 5: callback chain → loginState ===
-            login_state = await self._esia_callback_to_login_state(
-                esia_client, redirect_url,
-            )
-
-            # === ШАГ 6–8: account-info → IDP-логин → сессия SGO ===
-            await self._esia_finalize_login(
-                esia_client, sgo_origin, login_state, school,
-                timeout=timeout,
+            # === ШАГ 4–8: MFA → callback → IDP-логин → сессия SGO ===
+            await self._complete_esia_login(
+                esia_client, sgo_origin, login_data, school,
+                otp_callback=otp_callback, timeout=timeout,
             )
-          except exceptions.ESIAError:
+        except exceptions.ESIAError:
             raise
-          except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout) as exc:
             raise exceptions.ESIAError(
                 f"Не удалось подключиться к серверу Госуслуг (ESIA): {exc}"
             ) from exc
@@ -683,19 +982,18 @@ class NetSchool:
     @staticmethod
     def _print_qr_to_stdout(qr_content: str) -> None:
         """Печатает QR-код в stdout (fallback если нет callback)."""
-        try:
-            import qrcode as _qr
-            q = _qr.QRCode(error_correction=_qr.constants.ERROR_CORRECT_L)
-            q.add_data(qr_content)
-            q.make(fit=True)
-            log.info("Отсканируйте QR-код в приложении «Госуслуги»")
-            q.print_ascii(invert=True)
-        except ImportError:
+        if _qrcode is None:
             log.info(
                 "Отсканируйте QR-код в приложении «Госуслуги».\n"
                 "   Содержимое для QR: %s...",
                 qr_content[:80],
             )
+            return
+        q = _qrcode.QRCode(error_correction=_qrcode.constants.ERROR_CORRECT_L)
+        q.add_data(qr_content)
+        q.make(fit=True)
+        log.info("Отсканируйте QR-код в приложении «Госуслуги»")
+        q.print_ascii(invert=True)
 
     # ── SSE-поллинг QR ───────────────────────────────────────
 
@@ -717,18 +1015,17 @@ class NetSchool:
         host = parsed.hostname
         path = parsed.path
 
-        cookie_parts = []
-        for cookie in esia_client.cookies.jar:
-            domain = cookie.domain or ""
-            if "esia" in domain or "gosuslugi" in domain or not domain:
-                cookie_parts.append(f"{cookie.name}={cookie.value}")
-        cookie_header = "; ".join(cookie_parts)
-
-        ctx = _ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = _ssl.CERT_NONE
+        # dict: при дублях (с доменом и без) берётся последнее значение
+        cookies = {
+            c.name: c.value
+            for c in esia_client.cookies.jar
+            if _is_esia_domain(c.domain)
+        }
+        cookie_header = "; ".join(f"{k}={v}" for k, v in cookies.items())
 
-        reader, writer = await asyncio.open_connection(host, 443, ssl=ctx)
+        reader, writer = await asyncio.open_connection(
+            host, 443, ssl=_esia_sse_ssl_context(),
+        )
 
         try:
             request = (
@@ -744,7 +1041,27 @@ class NetSchool:
             writer.write(request.encode())
             await writer.drain()
 
-            buffer = b""
+            # Статус-строка приходит вместе с первым событием. Если это
+            # не 200 (сессия QR не найдена, 403 и т.п.) — событий не будет,
+            # падаем сразу, а не по таймауту.
+            status_line = await asyncio.wait_for(
+                reader.readline(), timeout=timeout,
+            )
+            if not status_line:
+                raise exceptions.ESIAError("SSE соединение закрыто сервером")
+            parts = status_line.split(None, 2)
+            if len(parts) < 2 or parts[1] != b"200":
+                raise exceptions.ESIAError(
+                    f"SSE ESIA вернул неожиданный ответ: "
+                    f"{status_line.decode('latin-1').strip()}"
+                )
+
+            # Заголовки ответа ниже отсеиваются как строки без ``data:``
+            # bytearray дописывается на месте, а разобранные строки
+            # срезаются одним del за чтение — без копирования всего
+            # хвоста на каждой строке
+            buffer = bytearray()
+            scan_start = 0
             while True:
                 chunk = await asyncio.wait_for(
                     reader.read(8192), timeout=timeout,
@@ -755,20 +1072,29 @@ class NetSchool:
                     )
                 buffer += chunk
 
-                while b"\n" in buffer:
-                    line_bytes, buffer = buffer.split(b"\n", 1)
-                    line = line_bytes.decode("utf-8", errors="replace").strip()
+                pos = 0
+                while True:
+                    nl = buffer.find(b"\n", max(pos, scan_start))
+                    if nl < 0:
+                        del buffer[:pos]
+                        # незавершённую строку повторно не просматриваем
+                        scan_start = len(buffer)
+                        break
+                    line = bytes(buffer[pos:nl]).lstrip()
+                    pos = nl + 1
+                    scan_start = 0
 
-                    if not line.startswith("data:"):
+                    # keep-alive комментарии и пустые строки не декодируем
+                    if not line.startswith(b"data:"):
                         continue
 
-                    data_str = line[5:].strip()
-                    if not data_str:
+                    payload = line[5:].strip()
+                    if not payload:
                         continue
 
                     try:
-                        data = json.loads(data_str)
-                    except (json.JSONDecodeError, ValueError):
+                        data = _json_loads(payload)
+                    except ValueError:
                         continue
 
                     error = data.get("error", {})
@@ -777,11 +1103,7 @@ class NetSchool:
                         if isinstance(error, dict)
                         else ""
                     )
-                    if code in (
-                        "QR_AUTHORIZATION_SESSION_EXPIRED",
-                        "QR_CODE_SESSION_NOT_FOUND",
-                        "QR_CODE_SESSION_OUTDATED",
-                    ):
+                    if code in _QR_EXPIRED_CODES:
                         raise exceptions.ESIAError(
                             f"QR сессия истекла: {code}"
                         )
@@ -833,10 +1155,11 @@ class NetSchool:
         labels = [_label(u) for u in users]
 
         if school:
-            needle = school.lower()
-            for idx, lbl in enumerate(labels):
-                if needle in lbl.lower():
-                    return users[idx]
+            # casefold корректнее lower() для Unicode (ё, ß и т.п.)
+            needle = school.casefold()
+            for user, lbl in zip(users, labels, strict=True):
+                if needle in lbl.casefold():
+                    return user
             raise exceptions.LoginError(
                 f"Организация «{school}» не найдена. "
                 f"Доступные: {', '.join(labels)}"
@@ -917,16 +1240,14 @@ class NetSchool:
                 else:
                     code = otp_callback(mfa_type, otp_details)
             else:
-                code = input(prompt).strip()
+                # input() в отдельном потоке: keep-alive и другие задачи
+                # продолжают работать, пока пользователь вводит код
+                code = (await asyncio.to_thread(input, prompt)).strip()
             if not code:
                 raise exceptions.MFAError("Код подтверждения не введён")
 
-            verify_url_map = {
-                "TOTP": f"{base}/mfa/verify",
-                "SMS":  f"{base}/otp/verify",
-                "MAX":  f"{base}/otp-max/verify",
-            }
-            verify_url = verify_url_map.get(mfa_type)
+            verify_path = _MFA_VERIFY_PATHS.get(mfa_type)
+            verify_url = base + verify_path if verify_path else None
 
             tried_urls: list[str] = []
             if verify_url:
@@ -938,21 +1259,36 @@ class NetSchool:
                 )
             else:
                 raw_lower = str(mfa_type_raw).lower()
-                tried_urls = [
+                candidates = [
                     f"{base}/mfa/verify",
                     f"{base}/{raw_lower}/verify",
                     f"{base}/otp-{raw_lower}/verify",
                     f"{base}/otp/verify",
                 ]
+                # endpoint, найденный при прошлом входе, пробуем первым;
+                # если он пропал (404) — перебираем остальные в том же
+                # вызове, код при этом не теряется
+                known_url = _MFA_VERIFY_URLS.get(raw_lower)
+                if known_url in candidates:
+                    candidates.remove(known_url)
+                    candidates.insert(0, known_url)
                 r = None
-                for url in tried_urls:
+                for url in candidates:
+                    tried_urls.append(url)
                     r = await esia_client.post(
                         url,
                         params={"code": code},
                         headers=_ESIA_API_HEADERS,
                     )
-                    if r.status_code != 404:
-                        break
+                    if r.status_code == 404:
+                        if url == known_url:
+                            _MFA_VERIFY_URLS.pop(raw_lower, None)
+                        continue
+                    # Запоминаем только подтверждённый endpoint: 400/403/5xx
+                    # бывают и из-за неверного кода или сбоя сервера
+                    if r.status_code in (200, 201):
+                        _MFA_VERIFY_URLS[raw_lower] = url
+                    break
 
             if r is None or r.status_code == 404:
                 raise exceptions.MFAError(
@@ -965,7 +1301,7 @@ class NetSchool:
                     f"{r.status_code} {r.text[:300]}"
                 )
 
-            data = r.json()
+            data = _json_loads(r.content)
 
             if data.get("failed"):
                 error_code = data["failed"]
@@ -1020,7 +1356,7 @@ class NetSchool:
             resp = await esia_client.get(
                 f"{base}/next-step", headers=_ESIA_API_HEADERS,
             )
-            data = resp.json()
+            data = _json_loads(resp.content)
 
         action = data.get("action", "")
 
@@ -1033,42 +1369,40 @@ class NetSchool:
                     "ESIA вернула DONE без redirect_url"
                 )
 
-            elif action == "MAX_QUIZ":
-                max_details = data.get("max_details", {})
-                if not max_details.get("skippable", False):
-                    raise exceptions.ESIAError(
-                        "ESIA требует настройку Госключа (MAX_QUIZ), "
-                        "но пропуск недоступен. Настройте Госключ в "
-                        "личном кабинете Госуслуг."
-                    )
+            elif action in _ESIA_SKIP_ENDPOINTS:
+                if action == "MAX_QUIZ":
+                    max_details = data.get("max_details", {})
+                    if not max_details.get("skippable", False):
+                        raise exceptions.ESIAError(
+                            "ESIA требует настройку Госключа (MAX_QUIZ), "
+                            "но пропуск недоступен. Настройте Госключ в "
+                            "личном кабинете Госуслуг."
+                        )
                 resp = await esia_client.post(
-                    f"{base}/quiz-max/skip",
+                    f"{base}/{_ESIA_SKIP_ENDPOINTS[action]}",
                     json={},
                     headers=_ESIA_API_HEADERS,
                 )
-                if resp.status_code != 200:
+                if resp.status_code in (200, 201):
+                    # Ответ на skip уже содержит следующий шаг —
+                    # next-step нужен, только если action в нём нет
+                    try:
+                        new_data = _json_loads(resp.content)
+                    except ValueError:
+                        new_data = {}
+                    if isinstance(new_data, dict) and new_data.get("action"):
+                        data = new_data
+                        action = data["action"]
+                        continue
+                elif action == "MAX_QUIZ":
                     raise exceptions.ESIAError(
                         f"Не удалось пропустить MAX_QUIZ "
                         f"(HTTP {resp.status_code})"
                     )
-                data = resp.json()
-                action = data.get("action", "")
-                continue
-
-            elif action == "CHANGE_PASSWORD":
-                resp = await esia_client.post(
-                    f"{base}/change-password/skip",
-                    json={},
-                    headers=_ESIA_API_HEADERS,
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    action = data.get("action", "")
-                    continue
                 resp = await esia_client.get(
                     f"{base}/next-step", headers=_ESIA_API_HEADERS,
                 )
-                data = resp.json()
+                data = _json_loads(resp.content)
                 action = data.get("action", "")
                 continue
 
@@ -1081,7 +1415,7 @@ class NetSchool:
                 resp = await esia_client.get(
                     f"{base}/next-step", headers=_ESIA_API_HEADERS,
                 )
-                data = resp.json()
+                data = _json_loads(resp.content)
                 action = data.get("action", "")
                 continue
 
@@ -1089,7 +1423,7 @@ class NetSchool:
                 resp = await esia_client.get(
                     f"{base}/next-step", headers=_ESIA_API_HEADERS,
                 )
-                new_data = resp.json()
+                new_data = _json_loads(resp.content)
                 new_action = new_data.get("action", "")
                 if new_action == action:
                     raise exceptions.ESIAError(
@@ -1125,7 +1459,7 @@ class NetSchool:
             json={"guid": guid},
             headers=_ESIA_API_HEADERS,
         )
-        start_data = r.json() if r.status_code == 200 else {}
+        start_data = _json_loads(r.content) if r.status_code == 200 else {}
 
         phone = start_data.get("phone", "***")
         code_len = start_data.get("code_length", 6)
@@ -1139,7 +1473,9 @@ class NetSchool:
             else:
                 code = otp_callback("SMS", anomaly_details)
         else:
-            code = input("Введите код подтверждения: ").strip()
+            code = (
+                await asyncio.to_thread(input, "Введите код подтверждения: ")
+            ).strip()
         if not code:
             raise exceptions.MFAError("Код подтверждения не введён")
 
@@ -1154,7 +1490,7 @@ class NetSchool:
                 f"{r.status_code} {r.text[:300]}"
             )
 
-        result = r.json()
+        result = _json_loads(r.content)
         log.info("Проверка безопасности пройдена!")
 
         redirect_url = result.get("redirect_url")
@@ -1170,7 +1506,7 @@ class NetSchool:
         r = await esia_client.get(
             f"{base}/next-step", headers=_ESIA_API_HEADERS,
         )
-        return await self._handle_esia_post_mfa(esia_client, r.json(), otp_callback=otp_callback)
+        return await self._handle_esia_post_mfa(esia_client, _json_loads(r.content), otp_callback=otp_callback)
 
     async def _poll_esia_push(
         self,
@@ -1178,23 +1514,38 @@ class NetSchool:
         login_data: dict,
         max_wait: int = 120,
     ) -> str:
-        """Поллинг статуса push-подтверждения."""
+        """Поллинг статуса push-подтверждения.
+
+        Интервал растёт экспоненциально (1 с → 5 с): быстрый ответ
+        пользователя замечается почти сразу, а долгое ожидание не
+        заваливает ESIA запросами. ``max_wait`` отсчитывается по
+        ``time.monotonic()`` с учётом времени самих запросов.
+        """
         challenge_id = login_data.get("challenge_id", "")
         state = login_data.get("state", "")
         poll_url = "https://esia.gosuslugi.ru/aas/oauth2/api/login/poll"
+        deadline = time.monotonic() + max_wait
 
-        for _ in range(max_wait // 3):
-            await asyncio.sleep(3)
+        attempt = 0
+        while True:
+            delay = min(1.7 ** attempt, 5.0)
+            attempt += 1
+            if time.monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
             try:
-                resp = await esia_client.post(
-                    poll_url,
-                    json={
-                        "challenge_id": challenge_id,
-                        "state": state,
-                    },
-                    headers=_ESIA_API_HEADERS,
+                resp = await asyncio.wait_for(
+                    esia_client.post(
+                        poll_url,
+                        json={
+                            "challenge_id": challenge_id,
+                            "state": state,
+                        },
+                        headers=_ESIA_API_HEADERS,
+                    ),
+                    timeout=max(deadline - time.monotonic(), 0.1),
                 )
-                data = resp.json()
+                data = _json_loads(resp.content)
                 if "redirect_url" in data:
                     return data["redirect_url"]
                 if "failed" in data:
@@ -1232,45 +1583,144 @@ class NetSchool:
             self._keepalive_task = None
 
     async def _keepalive_loop(self) -> None:
-        """Пингует ``GET /context`` раз в ``_keepalive_interval`` секунд."""
+        """Пингует ``GET /context`` раз в ``_keepalive_interval`` секунд.
+
+        Если включён прогрев — между пингами раз в ``_warm_interval``
+        секунд делает дешёвый ``GET /logindata``, чтобы соединение
+        в пуле не простаивало дольше ``keepalive_expiry``.
+        """
+        self._adapt_keepalive_interval()
+        next_ping = time.monotonic() + self._keepalive_interval
         while True:
-            await asyncio.sleep(self._keepalive_interval)
+            delay = next_ping - time.monotonic()
+            if self._warm_interval:
+                delay = min(delay, self._warm_interval)
+            await asyncio.sleep(max(delay, 0))
+            if self._warm_interval and time.monotonic() < next_ping:
+                try:
+                    await self._http.get("logindata", timeout=2)
+                except Exception:
+                    pass
+                continue
             try:
                 await self._http.get("context")
             except Exception:
-                pass
+                next_ping = time.monotonic() + self._keepalive_interval
+                continue
+            self._adapt_keepalive_interval()
+            next_ping = time.monotonic() + self._keepalive_interval
+
+    def _adapt_keepalive_interval(self) -> None:
+        """Интервал = 70% оставшегося срока NSSESSIONID (не меньше минуты).
+
+        Если у куки нет срока (сессионная кука) — остаётся 5 минут.
+        """
+        if not self._keepalive_adaptive:
+            return
+        expires = None
+        for cookie in self._http.client.cookies.jar:
+            if cookie.name == "NSSESSIONID" and cookie.expires:
+                expires = cookie.expires
+                break
+        if expires is None:
+            self._keepalive_interval = 300
+            return
+        ttl = expires - time.time()
+        self._keepalive_interval = max(60, int(ttl * 0.7))
 
     def set_keepalive_interval(self, seconds: int) -> None:
-        """Установить интервал keep-alive. ``0`` — отключить."""
+        """Установить интервал keep-alive. ``0`` — отключить.
+
+        Явно заданный интервал больше не подстраивается под срок
+        жизни сессии.
+        """
+        self._keepalive_adaptive = False
         self._keepalive_interval = seconds
         if seconds <= 0:
             self._stop_keepalive()
         elif self._access_token:
             self._start_keepalive()
 
+    def set_connection_warming(self, seconds: float | None = None) -> None:
+        """Держать соединение с сервером «тёплым» между запросами.
+
+        Пока работает keep-alive, раз в ``seconds`` секунд выполняется
+        лёгкий ``GET /logindata``, и соединение в пуле не закрывается
+        по ``keepalive_expiry`` — следующий запрос обходится без нового
+        TCP/TLS-рукопожатия. Полезно для редкого опроса (раз в минуту
+        и реже). ``None`` — чуть меньше ``keepalive_expiry`` пула
+        (не больше 10 с), ``0`` — выключить (по умолчанию).
+        """
+        if seconds is None:
+            expiry = self._http.limits.keepalive_expiry or 5.0
+            seconds = max(1.0, min(expiry - 2, 10.0))
+        self._warm_interval = max(seconds, 0)
+        if self._keepalive_task is not None:
+            self._start_keepalive()
+
     # ═══════════════════════════════════════════════════════════
     #  Вспомогательные способы входа
     # ═══════════════════════════════════════════════════════════
 
+    async def _load_assignment_types(
+        self, *, timeout: int | None = None,
+    ) -> None:
+        """Загрузить справочник типов заданий (name + abbreviation).
+
+        Справочник почти не меняется, поэтому для известной школы
+        он берётся из кэша процесса (TTL — сутки).
+        """
+        key = (self._http.base_url, self._school_id)
+        if self._school_id > 0:
+            cached = _ASSIGNMENT_TYPES_CACHE.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._assignment_types = cached[1]
+                return
+
+        resp = await self._http.get(
+            "grade/assignment/types", params={"all": False}, timeout=timeout,
+        )
+        self._assignment_types = MappingProxyType({
+            a["id"]: AssignmentType(a["name"], a.get("abbr", ""))
+            for a in self._http.parse_json(resp)
+        })
+        if self._school_id > 0:
+            _ASSIGNMENT_TYPES_CACHE[key] = (
+                time.monotonic() + _ASSIGNMENT_TYPES_TTL,
+                self._assignment_types,
+            )
+
+    def _assign_student(self, info: dict) -> None:
+        """Запомнить текущего ученика из ответа ``student/diary/init``."""
+        student = info["students"][info["currentStudentId"]]
+        self._student_id = student["studentId"]
+        self._user_params = httpx.QueryParams({"userId": self._student_id})
+
     async def _finish_login(self, *, timeout: int | None = None) -> None:
-        """Загрузка данных после успешной авторизации (год, типы заданий)."""
-        resp = await self._http.get("years/current", timeout=timeout)
-        self._year_id = resp.json()["id"]
+        """Загрузка данных после успешной авторизации (год, типы заданий).
 
-        if self._school_id <= 0:
+        Год загружается параллельно с типами заданий. Если ID школы ещё
+        не известен, перед типами запрашивается ``context``: по ID школы
+        справочник типов берётся из кэша процесса и туда же попадает.
+        Ошибка ``context`` не критична.
+        """
+        async def school_then_types() -> None:
             try:
-                ctx_resp = await self._http.get("context", timeout=timeout)
-                self._school_id = ctx_resp.json().get("schoolId", -1)
+                resp = await self._http.get("context", timeout=timeout)
+                self._school_id = self._http.parse_json(resp).get(
+                    "schoolId", -1,
+                )
             except Exception:
                 pass
+            await self._load_assignment_types(timeout=timeout)
 
-        resp = await self._http.get(
-            "grade/assignment/types", params={"all": False}, timeout=timeout,
+        year_resp, _ = await _gather_or_cancel(
+            self._http.get("years/current", timeout=timeout),
+            self._load_assignment_types(timeout=timeout)
+            if self._school_id > 0
+            else school_then_types(),
         )
-        self._assignment_types = {
-            a["id"]: {"name": a["name"], "abbr": a.get("abbr", "")}
-            for a in resp.json()
-        }
+        self._year_id = self._http.parse_json(year_resp)["id"]
 
     async def login_with_token(
         self,
@@ -1283,13 +1733,8 @@ class NetSchool:
         self._access_token = token
         self._http.set_header("at", token)
 
-        resp = await self._http.get("student/diary/init", timeout=timeout)
-        info = resp.json()
-        student = info["students"][info["currentStudentId"]]
-        self._student_id = student["studentId"]
-
-        await self._finish_login(timeout=timeout)
-
+        # Школа известна заранее — _finish_login не запрашивает context
+        # и берёт типы заданий из кэша этой школы
         if school is not None:
             if isinstance(school, str):
                 self._school_id = await self._resolve_school(
@@ -1298,6 +1743,15 @@ class NetSchool:
             else:
                 self._school_id = school
 
+        # Токен уже установлен: diary/init не зависит от года и типов;
+        # при ошибке одного запроса второй отменяется
+        resp, _ = await _gather_or_cancel(
+            self._http.get("student/diary/init", timeout=timeout),
+            self._finish_login(timeout=timeout),
+        )
+        info = self._http.parse_json(resp)
+        self._assign_student(info)
+
         self._credentials = ()
         self._start_keepalive()
 
@@ -1334,16 +1788,14 @@ class NetSchool:
                 "'NSSESSIONID=xxx' или полную Cookie-строку из DevTools."
             )
 
-        for name, value in parsed.items():
-            self._http.set_cookie(name, value)
+        self._http.update_cookies(parsed.items())
 
         try:
             resp = await self._http.get(
                 "student/diary/init", timeout=timeout,
             )
-            info = resp.json()
-            student = info["students"][info["currentStudentId"]]
-            self._student_id = student["studentId"]
+            info = self._http.parse_json(resp)
+            self._assign_student(info)
         except Exception as e:
             raise exceptions.SessionExpired(
                 f"Куки невалидны или сессия истекла: {e}"
@@ -1372,13 +1824,12 @@ class NetSchool:
         raw = raw.strip()
         if not raw:
             return {}
-        if re.fullmatch(r"[0-9a-fA-F]{32}", raw):
+        if _HEX32_RE.fullmatch(raw):
             return {"NSSESSIONID": raw}
         result = {}
         for part in raw.split(";"):
-            part = part.strip()
-            if "=" in part:
-                key, _, value = part.partition("=")
+            key, sep, value = part.partition("=")
+            if sep:
                 result[key.strip()] = value.strip()
         return result if "NSSESSIONID" in result else {}
 
@@ -1387,26 +1838,32 @@ class NetSchool:
         session_store: str,
     ) -> Optional[str]:
         try:
-            data = json.loads(session_store)
-        except Exception:
+            data = _json_loads(session_store)
+            # sessionStorage иногда хранит JSON, сериализованный дважды
+            if isinstance(data, str):
+                if not data.lstrip().startswith(("{", "[")):
+                    return None
+                data = _json_loads(data)
+        except (ValueError, TypeError):
+            # TypeError — не строка (None, число): как и раньше, токена нет
             return None
 
-        if isinstance(data, str):
-            try:
-                data = json.loads(data)
-            except Exception:
-                return None
-
         if isinstance(data, dict):
             return data.get("accessToken") or data.get("at")
 
         if isinstance(data, list):
+            # активная запись приоритетнее, иначе — первая с токеном
+            fallback = None
             for item in data:
-                if isinstance(item, dict) and item.get("active") and item.get("accessToken"):
-                    return item["accessToken"]
-            for item in data:
-                if isinstance(item, dict) and item.get("accessToken"):
-                    return item["accessToken"]
+                if not isinstance(item, dict):
+                    continue
+                token = item.get("accessToken")
+                if token:
+                    if item.get("active"):
+                        return token
+                    if fallback is None:
+                        fallback = token
+            return fallback
         return None
 
     # ═══════════════════════════════════════════════════════════
@@ -1430,7 +1887,7 @@ class NetSchool:
             "school_id": self._school_id,
             "cookies": dict(self._http.client.cookies),
         }
-        return json.dumps(data, ensure_ascii=False)
+        return _json_dumps(data)
 
     async def import_session(
         self,
@@ -1453,17 +1910,15 @@ class NetSchool:
         self._access_token = payload["access_token"]
         self._http.set_header("at", self._access_token)
 
-        for name, value in payload.get("cookies", {}).items():
-            self._http.set_cookie(name, value)
+        self._http.update_cookies(payload.get("cookies", {}).items())
 
         # Проверяем валидность сессии
         try:
             resp = await self._http.get(
                 "student/diary/init", timeout=timeout,
             )
-            info = resp.json()
-            student = info["students"][info["currentStudentId"]]
-            self._student_id = student["studentId"]
+            info = self._http.parse_json(resp)
+            self._assign_student(info)
         except Exception as e:
             raise exceptions.SessionExpired(
                 f"Сессия истекла или невалидна: {e}"
@@ -1479,37 +1934,81 @@ class NetSchool:
     #  API-методы
     # ═══════════════════════════════════════════════════════════
 
+    async def _authed_send(
+        self,
+        method: str,
+        path: str,
+        *,
+        timeout: int | httpx.Timeout | None = None,
+        **kw: Any,
+    ) -> httpx.Response:
+        """Запрос с автоматической переавторизацией при 401.
+
+        Переавторизация выполняется не более одного раза: повторный 401
+        означает, что сохранённые учётные данные больше не подходят.
+        Одновременные запросы, получившие 401, входят заново один раз:
+        остальные дожидаются его и просто повторяют запрос.
+        """
+        if method == "GET":
+            send = self._http.get
+        elif method == "POST":
+            send = self._http.post
+        else:  # "DOWNLOAD": GET с потоковой записью тела в буфер
+            send = self._http.download
+        relogged = False
+        while True:
+            generation = self._session_generation
+            try:
+                async with self._inflight:
+                    return await send(path, timeout=timeout, **kw)
+            except httpx.HTTPStatusError as exc:
+                if exc.response.status_code != httpx.codes.UNAUTHORIZED:
+                    raise
+                if relogged or not self._credentials:
+                    raise exceptions.SessionExpired(
+                        "Сессия истекла. Авторизуйтесь заново."
+                    ) from None
+            async with self._relogin_lock:
+                # Пока ждали блокировку, сессию мог обновить другой запрос
+                if self._session_generation == generation:
+                    await self._relogin()
+                    self._session_generation += 1
+            relogged = True
+
+    def set_max_inflight(self, limit: int) -> None:
+        """Сколько API-запросов может выполняться одновременно.
+
+        По умолчанию 50 — с запасом меньше пула соединений, так что
+        ``asyncio.gather`` по сотням заданий не упирается в ``PoolTimeout``.
+        Новое значение действует для запросов, начатых после вызова.
+        """
+        if limit < 1:
+            raise ValueError("limit должен быть >= 1")
+        self._inflight = asyncio.Semaphore(limit)
+
     async def _authed_get(
-        self, path: str, *, timeout: int | None = None, **kw: Any,
+        self, path: str, *, timeout: int | httpx.Timeout | None = None, **kw: Any,
     ) -> httpx.Response:
         """GET с автоматической переавторизацией при 401."""
-        try:
-            return await self._http.get(path, timeout=timeout, **kw)
-        except httpx.HTTPStatusError as exc:
-            if exc.response.status_code == httpx.codes.UNAUTHORIZED:
-                if self._credentials:
-                    await self.login(*self._credentials)
-                    return await self._http.get(path, timeout=timeout, **kw)
-                raise exceptions.SessionExpired(
-                    "Сессия истекла. Авторизуйтесь заново."
-                ) from None
-            raise
+        return await self._authed_send("GET", path, timeout=timeout, **kw)
 
     async def _authed_post(
-        self, path: str, *, timeout: int | None = None, **kw: Any,
+        self, path: str, *, timeout: int | httpx.Timeout | None = None, **kw: Any,
     ) -> httpx.Response:
         """POST с автоматической переавторизацией при 401."""
-        try:
-            return await self._http.post(path, timeout=timeout, **kw)
-        except httpx.HTTPStatusError as exc:
-            if exc.response.status_code == httpx.codes.UNAUTHORIZED:
-                if self._credentials:
-                    await self.login(*self._credentials)
-                    return await self._http.post(path, timeout=timeout, **kw)
-                raise exceptions.SessionExpired(
-                    "Сессия истекла. Авторизуйтесь заново."
-                ) from None
-            raise
+        return await self._authed_send("POST", path, timeout=timeout, **kw)
+
+    @staticmethod
+    def _week_range(
+        start: date | None, end: date | None,
+    ) -> tuple[date, date]:
+        """Границы учебной недели (пн–сб); по умолчанию — текущей."""
+        if not start:
+            today = date.today()
+            start = today - timedelta(days=today.weekday())
+        if not end:
+            end = start + timedelta(days=5)
+        return start, end
 
     async def diary(
         self,
@@ -1519,11 +2018,7 @@ class NetSchool:
         timeout: int | None = None,
     ) -> Diary:
         """Получить дневник за неделю (по-умолчанию — текущую)."""
-        if not start:
-            start = date.today() - timedelta(days=date.today().weekday())
-        if not end:
-            end = start + timedelta(days=5)
-
+        start, end = self._week_range(start, end)
         resp = await self._authed_get(
             "student/diary",
             params={
@@ -1534,7 +2029,9 @@ class NetSchool:
             },
             timeout=timeout,
         )
-        return Diary.from_raw(resp.json(), self._assignment_types)
+        return Diary.from_raw(
+            self._http.parse_json(resp), self._assignment_types,
+        )
 
     async def overdue(
         self,
@@ -1544,11 +2041,7 @@ class NetSchool:
         timeout: int | None = None,
     ) -> List[Assignment]:
         """Получить просроченные задания."""
-        if not start:
-            start = date.today() - timedelta(days=date.today().weekday())
-        if not end:
-            end = start + timedelta(days=5)
-
+        start, end = self._week_range(start, end)
         resp = await self._authed_get(
             "student/diary/pastMandatory",
             params={
@@ -1561,9 +2054,29 @@ class NetSchool:
         )
         return [
             Assignment.from_raw(a, self._assignment_types)
-            for a in resp.json()
+            for a in self._http.parse_json(resp)
         ]
 
+    async def week_summary(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        *,
+        timeout: int | None = None,
+    ) -> tuple[Diary, List[Assignment]]:
+        """Дневник и просроченные задания за неделю одним вызовом.
+
+        Оба запроса выполняются параллельно — это быстрее, чем
+        ``diary()`` и ``overdue()`` по очереди.
+        """
+        # Одни границы для обоих запросов, даже если вызов пришёлся на полночь
+        start, end = self._week_range(start, end)
+        diary, overdue = await asyncio.gather(
+            self.diary(start, end, timeout=timeout),
+            self.overdue(start, end, timeout=timeout),
+        )
+        return diary, overdue
+
     async def announcements(
         self,
         take: int = -1,
@@ -1574,7 +2087,9 @@ class NetSchool:
         resp = await self._authed_get(
             "announcements", params={"take": take}, timeout=timeout,
         )
-        return [Announcement.from_raw(a) for a in resp.json()]
+        return [
+            Announcement.from_raw(a) for a in self._http.parse_json(resp)
+        ]
 
     async def attachments(
         self,
@@ -1589,7 +2104,7 @@ class NetSchool:
             json={"assignId": [assignment_id]},
             timeout=timeout,
         )
-        items = resp.json()
+        items = self._http.parse_json(resp)
         if not items:
             return []
         return [
@@ -1601,41 +2116,52 @@ class NetSchool:
         resp = await self._authed_get(
             f"schools/{self._school_id}/card", timeout=timeout,
         )
-        return School.from_raw(resp.json())
+        return School.from_raw(self._http.parse_json(resp))
 
     async def download_attachment(
         self,
         attachment_id: int,
-        buffer: BytesIO,
+        buffer: BinaryIO,
         *,
         timeout: int | None = None,
     ) -> None:
-        """Скачать вложение в буфер."""
-        resp = await self._authed_get(
-            f"attachments/{attachment_id}", timeout=timeout,
+        """Скачать вложение в буфер.
+
+        ``buffer`` — любой объект с методом ``write(bytes)``: ``BytesIO``
+        или файл, открытый в режиме ``"wb"``. Тело пишется в буфер
+        по частям, без промежуточной копии в памяти; ``timeout``
+        ограничивает и приём тела.
+
+        Если передача оборвалась, буфер с поддержкой ``seek`` откатывается
+        к исходной позиции — недокачанный файл не остаётся. В потоке без
+        перемотки (pipe, сокет) записанная часть остаётся.
+        """
+        await self._authed_send(
+            "DOWNLOAD", f"attachments/{attachment_id}", buffer=buffer,
+            timeout=timeout,
         )
-        buffer.write(resp.content)
 
     async def download_profile_picture(
         self,
         user_id: int,
-        buffer: BytesIO,
+        buffer: BinaryIO,
         *,
         timeout: int | None = None,
     ) -> None:
         """Скачать аватар пользователя."""
-        resp = await self._authed_get(
+        await self._authed_send(
+            "DOWNLOAD",
             "users/photo",
+            buffer=buffer,
             params={"userId": user_id},
             timeout=timeout,
             follow_redirects=True,
         )
-        buffer.write(resp.content)
 
     # ══ Способы входа ═════════════════════════════════════════
 
     async def login_methods(
-        self, *, timeout: int | None = None,
+        self, *, timeout: int | None = None, force_refresh: bool = False,
     ) -> LoginMethods:
         """Получить информацию о доступных способах входа.
 
@@ -1651,8 +2177,9 @@ class NetSchool:
             if methods.esia_main:
                 print("Нужно входить через Госуслуги!")
         """
-        resp = await self._http.get("logindata", timeout=timeout)
-        return LoginMethods.from_raw(resp.json())
+        return await _fetch_login_methods(
+            self._http, timeout=timeout, force_refresh=force_refresh,
+        )
 
     # ══ Школы ════════════════════════════════════════════════
 
@@ -1682,7 +2209,9 @@ class NetSchool:
         resp = await self._http.get(
             "schools/search", params={"name": name}, timeout=timeout,
         )
-        return [ShortSchool.from_raw(s) for s in resp.json()]
+        return [
+            ShortSchool.from_raw(s) for s in self._http.parse_json(resp)
+        ]
 
     async def schools(
         self, *, timeout: int | None = None,
@@ -1699,33 +2228,57 @@ class NetSchool:
         """Найти ID школы по названию.
 
         Сначала ищет точное совпадение по ``shortName``, затем
-        по вхождению в ``shortName`` или ``name``.
+        по ``name`` (без суффикса с городом); регистр и лишние
+        пробелы не учитываются.
         Если результат неоднозначен — бросает :class:`SchoolNotFound`.
+
+        Найденный ID запоминается на уровне процесса, поэтому повторный
+        вход в ту же школу обходится без ``schools/search``.
         """
+        key = (self._http.base_url, school_name)
+        cached = _SCHOOL_ID_CACHE.get(key)
+        if cached is not None:
+            self._school_id = cached
+            return cached
+
         resp = await self._http.get(
             "schools/search", params={"name": school_name}, timeout=timeout,
         )
-        items = resp.json()
+        items = self._http.parse_json(resp)
 
-        # 1. Точное совпадение по shortName
+        # Индексы по shortName и name (без суффикса с городом) за один
+        # проход; сравнение без учёта регистра и лишних пробелов,
+        # при совпадениях побеждает первая школа в выдаче
+        by_short: dict[str, int] = {}
+        by_name: dict[str, int] = {}
         for s in items:
-            if s.get("shortName") == school_name:
-                self._school_id = s["id"]
-                return s["id"]
+            by_short.setdefault(_school_key(s.get("shortName") or ""), s["id"])
+            by_name.setdefault(
+                _school_key((s.get("name") or "").split(" (", 1)[0]), s["id"],
+            )
 
-        # 2. Точное совпадение по name (без суффикса с городом)
-        for s in items:
-            if s.get("name", "").split(" (")[0] == school_name:
-                self._school_id = s["id"]
-                return s["id"]
+        query = _school_key(school_name)
+        # 1. Точное совпадение по shortName, 2. — по name
+        for index in (by_short, by_name):
+            school_id = index.get(query)
+            if school_id is not None:
+                return self._remember_school(key, school_id)
 
         # 3. Единственный результат — используем его
         if len(items) == 1:
-            self._school_id = items[0]["id"]
-            return items[0]["id"]
+            return self._remember_school(key, items[0]["id"])
 
         raise exceptions.SchoolNotFound(school_name)
 
+    def _remember_school(self, key: tuple[str, str], school_id: int) -> int:
+        self._school_id = _SCHOOL_ID_CACHE[key] = school_id
+        return school_id
+
+    def _forget_school(self, school: Union[int, str, None]) -> None:
+        """Сбросить запомненный ID школы (например, после ошибки входа)."""
+        if isinstance(school, str):
+            _SCHOOL_ID_CACHE.pop((self._http.base_url, school), None)
+
     # ═══════════════════════════════════════════════════════════
     #  Почта / сообщения
     # ═══════════════════════════════════════════════════════════
@@ -1745,12 +2298,6 @@ class NetSchool:
             page: Номер страницы (начиная с 1).
             page_size: Количество писем на странице.
         """
-        folder_labels = {
-            "Inbox": "Входящие",
-            "Sent": "Отправленные",
-            "Draft": "Черновики",
-            "Deleted": "Удалённые",
-        }
         resp = await self._authed_post(
             "mail/registry",
             json={
@@ -1759,25 +2306,21 @@ class NetSchool:
                         {
                             "filterId": "MailBox",
                             "filterValue": folder,
-                            "filterText": folder_labels.get(folder, folder),
-                        },
-                        {
-                            "filterId": "MessageType",
-                            "filterValue": "All",
-                            "filterText": "Все",
+                            "filterText": _MAIL_FOLDER_LABELS.get(folder, folder),
                         },
+                        _MAIL_MESSAGE_TYPE_FILTER,
                     ],
                     "params": None,
                 },
-                "fields": ["author", "subject", "sent"],
+                "fields": _MAIL_REGISTRY_FIELDS,
                 "page": page,
                 "pageSize": page_size,
                 "search": None,
-                "order": {"fieldId": "sent", "ascending": False},
+                "order": _MAIL_REGISTRY_ORDER,
             },
             timeout=timeout,
         )
-        return MailPage.from_raw(resp.json())
+        return MailPage.from_raw(self._http.parse_json(resp))
 
     async def mail_unread(
         self, *, timeout: int | None = None,
@@ -1785,38 +2328,108 @@ class NetSchool:
         """Список ID непрочитанных писем."""
         resp = await self._authed_get(
             "mail/messages/unread",
-            params={"userId": self._student_id},
+            params=self._user_params,
             timeout=timeout,
         )
-        return resp.json()
+        return self._http.parse_json(resp)
 
     async def mail_read(
         self, message_id: int, *, timeout: int | None = None,
     ) -> Message:
-        """Прочитать письмо по ID."""
+        """Прочитать письмо по ID.
+
+        Одновременные вызовы для одного и того же письма разделяют
+        один HTTP-запрос.
+        """
+        pending = self._mail_reads.get(message_id)
+        if pending is None:
+            pending = asyncio.ensure_future(
+                self._fetch_message(message_id, timeout),
+            )
+            self._mail_reads[message_id] = pending
+
+            def _done(task: asyncio.Future) -> None:
+                self._mail_reads.pop(message_id, None)
+                # Если все ожидающие отменены, ошибку запроса никто не
+                # заберёт — читаем её здесь, иначе asyncio пишет
+                # «Task exception was never retrieved»
+                if not task.cancelled():
+                    task.exception()
+
+            pending.add_done_callback(_done)
+        # shield: отмена одного ожидающего не отменяет запрос для остальных
+        return await asyncio.shield(pending)
+
+    async def _fetch_message(
+        self, message_id: int, timeout: int | None,
+    ) -> Message:
         resp = await self._authed_get(
             f"mail/messages/{message_id}/read",
-            params={"userId": self._student_id},
+            params=self._user_params,
             timeout=timeout,
         )
-        return Message.from_raw(resp.json())
+        return Message.from_raw(self._http.parse_json(resp))
+
+    async def mail_read_many(
+        self,
+        message_ids: List[int],
+        *,
+        concurrency: int = 16,
+        timeout: int | None = None,
+    ) -> List[Message]:
+        """Прочитать несколько писем параллельно.
+
+        Одновременно выполняется не более ``concurrency`` запросов;
+        письма возвращаются в порядке ``message_ids``.
+
+        Пример::
+
+            ids = await ns.mail_unread()
+            messages = await ns.mail_read_many(ids)
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency должен быть не меньше 1")
+        sem = asyncio.Semaphore(concurrency)
+
+        async def read_one(message_id: int) -> Message:
+            async with sem:
+                return await self.mail_read(message_id, timeout=timeout)
+
+        return list(await asyncio.gather(*map(read_one, message_ids)))
 
     async def mail_recipients(
-        self, *, timeout: int | None = None,
+        self, *, timeout: int | None = None, force_refresh: bool = False,
     ) -> List[MailRecipient]:
-        """Список доступных получателей писем (учителя, администрация)."""
+        """Список доступных получателей писем (учителя, администрация).
+
+        Список почти не меняется, поэтому 5 минут отдаётся из памяти.
+        ``force_refresh=True`` — запросить заново.
+        """
+        owner = (self._student_id, self._school_id)
+        cached = self._recipients_cache
+        if (
+            not force_refresh
+            and cached is not None
+            and cached[1] == owner
+            and cached[0] > time.monotonic()
+        ):
+            return list(cached[2])
+
         resp = await self._authed_get(
             "mail/recipients",
-            params={
-                "userId": self._student_id,
+            params=self._user_params.merge({
                 "organizationId": self._school_id,
-                "funcType": 2,
-                "orgType": 1,
-                "group": 1,
-            },
+                **_RECIPIENTS_STATIC_PARAMS,
+            }),
             timeout=timeout,
         )
-        return [MailRecipient.from_raw(r) for r in resp.json()]
+        recipients = [
+            MailRecipient.from_raw(r) for r in self._http.parse_json(resp)
+        ]
+        self._recipients_cache = (
+            time.monotonic() + _RECIPIENTS_TTL, owner, recipients,
+        )
+        return list(recipients)
 
     async def mail_send(
         self,
@@ -1833,17 +2446,17 @@ class NetSchool:
             text: Текст письма.
             to: Список ID получателей (из ``mail_recipients()``).
         """
+        payload = {
+            "subject": subject,
+            "text": text,
+            "to": [{"id": r} for r in to],
+            **_MAIL_SEND_STATIC,
+        }
+        # Сериализуем сами: orjson (если установлен) быстрее json.dumps httpx
         await self._authed_post(
             "mail/messages/send",
-            json={
-                "subject": subject,
-                "text": text,
-                "to": [{"id": r} for r in to],
-                "cc": [],
-                "bcc": [],
-                "notify": False,
-                "fileAttachments": [],
-            },
+            content=_json_dumps(payload).encode(),
+            headers={"content-type": "application/json"},
             timeout=timeout,
         )
 
@@ -1852,16 +2465,44 @@ class NetSchool:
     async def logout(self, *, timeout: int | None = None) -> None:
         """Завершить сессию."""
         self._stop_keepalive()
+        await self._close_esia_client()
         try:
             await self._http.post("auth/logout", timeout=timeout)
         except httpx.HTTPStatusError as exc:
             if exc.response.status_code != httpx.codes.UNAUTHORIZED:
                 raise
 
-    async def close(self, *, timeout: int | None = None) -> None:
-        """Завершить сессию и закрыть HTTP-клиент."""
-        await self.logout(timeout=timeout)
-        await self._http.close()
+    async def close(
+        self,
+        *,
+        timeout: int | None = None,
+        logout: bool = True,
+        graceful: bool = True,
+    ) -> None:
+        """Завершить сессию и закрыть HTTP-клиент.
+
+        :param logout: ``False`` — не завершать сессию на сервере
+            (например, если она сохранена через ``export_session()``
+            и будет восстановлена при следующем запуске).
+        :param graceful: ``False`` — не задерживать закрытие ради
+            ``logout``: ответ сервера ждём не дольше ``timeout``
+            (по умолчанию 2 с), ошибки игнорируются. Если выход не
+            успел — сессия истечёт на сервере сама.
+        """
+        if logout and graceful:
+            await self.logout(timeout=timeout)
+        elif logout:
+            limit = timeout or _FAST_LOGOUT_TIMEOUT
+            try:
+                await asyncio.wait_for(self.logout(timeout=limit), limit)
+            except (asyncio.TimeoutError, httpx.HTTPError,
+                    exceptions.NetSchoolError) as exc:
+                log.debug("logout при закрытии не удался: %r", exc)
+        else:
+            self._stop_keepalive()
+        await self._close_esia_client()
+        if self._owns_http:
+            await self._http.close()
 
 
 # ═══════════════════════════════════════════════════════════
@@ -1869,12 +2510,28 @@ class NetSchool:
 # ═══════════════════════════════════════════════════════════
 
 
+def _resolve_url(url: str) -> str:
+    """URL сервера или название региона → URL сервера."""
+    if url.startswith(("http://", "https://")):
+        return url
+    resolved = get_url(url)  # результаты get_url кэшируются
+    if resolved is None:
+        raise ValueError(
+            f"Не удалось определить URL для региона {url!r}. "
+            "Передайте URL сервера явно."
+        )
+    return resolved
+
+
 async def search_schools(
     url: str,
     query: str = "",
     *,
-    timeout: int | None = None,
+    timeout: int | httpx.Timeout | None = None,
     proxy: str | None = None,
+    session: HttpSession | None = None,
+    limits: httpx.Limits | None = None,
+    http2: bool = False,
 ) -> List[ShortSchool]:
     """Поиск школ по названию на указанном сервере.
 
@@ -1887,7 +2544,15 @@ async def search_schools(
              Можно передать название региона — функция
              попробует найти URL через :func:`get_url`.
         query: Часть названия школы.  Если пустая — вернёт все школы.
-        timeout: Таймаут запроса в секундах.
+        timeout: Таймаут запроса в секундах или ``httpx.Timeout``
+                 (например :data:`FAST_PROBE_TIMEOUT` — быстро
+                 отсекает недоступные серверы).
+        session: Готовая :class:`HttpSession` для этого сервера.
+                 Позволяет переиспользовать соединение между
+                 несколькими вызовами; такая сессия не закрывается.
+        limits: ``httpx.Limits`` пула соединений (если сессия
+                создаётся внутри функции).
+        http2: Использовать HTTP/2 (нужен пакет ``h2``).
 
     Returns:
         Список :class:`ShortSchool`.
@@ -1907,33 +2572,33 @@ async def search_schools(
 
         schools = await search_schools("Республика Мордовия", "Лицей")
     """
-    from netschoolpy.regions import get_url as _get_url
-
-    # Если передано имя региона вместо URL
-    if not url.startswith(("http://", "https://")):
-        resolved = _get_url(url)
-        if resolved is None:
-            raise ValueError(
-                f"Не удалось определить URL для региона {url!r}. "
-                "Передайте URL сервера явно."
-            )
-        url = resolved
+    url = _resolve_url(url)
 
-    session = HttpSession(url, timeout=timeout, proxy=proxy)
+    owned = session is None
+    if session is None:
+        session = HttpSession(
+            url, timeout=timeout, proxy=proxy, limits=limits, http2=http2,
+        )
     try:
         name = query if query else "У"
         resp = await session.get(
             "schools/search", params={"name": name}, timeout=timeout,
         )
-        return [ShortSchool.from_raw(s) for s in resp.json()]
+        return [ShortSchool.from_raw(s) for s in session.parse_json(resp)]
     finally:
-        await session.close()
+        if owned:
+            await session.close()
 
 
 async def get_login_methods(
     url: str,
     *,
-    timeout: int | None = None,
+    timeout: int | httpx.Timeout | None = None,
+    proxy: str | None = None,
+    session: HttpSession | None = None,
+    limits: httpx.Limits | None = None,
+    http2: bool = False,
+    force_refresh: bool = False,
 ) -> LoginMethods:
     """Узнать доступные способы входа на сервере.
 
@@ -1944,7 +2609,17 @@ async def get_login_methods(
         url: Базовый URL сервера ``"Сетевого города"``
              (например ``"https://sgo.e-mordovia.ru"``).
              Можно передать название региона.
-        timeout: Таймаут запроса в секундах.
+        timeout: Таймаут запроса в секундах или ``httpx.Timeout``
+                 (например :data:`FAST_PROBE_TIMEOUT`).
+        proxy: Необязательный SOCKS5/HTTP прокси-URL.
+        session: Готовая :class:`HttpSession` для этого сервера
+                 (не закрывается по завершении).
+        limits: ``httpx.Limits`` пула соединений (если сессия
+                создаётся внутри функции).
+        http2: Использовать HTTP/2 (нужен пакет ``h2``).
+        force_refresh: Не брать ответ из кэша. Способы входа сервера
+                 почти не меняются, поэтому по умолчанию ответ
+                 запоминается на час.
 
     Returns:
         :class:`LoginMethods` с флагами доступных способов.
@@ -1964,20 +2639,136 @@ async def get_login_methods(
 
         methods = await get_login_methods("Республика Мордовия")
     """
-    from netschoolpy.regions import get_url as _get_url
-
-    if not url.startswith(("http://", "https://")):
-        resolved = _get_url(url)
-        if resolved is None:
-            raise ValueError(
-                f"Не удалось определить URL для региона {url!r}. "
-                "Передайте URL сервера явно."
-            )
-        url = resolved
+    url = _resolve_url(url)
+
+    if not force_refresh:
+        cached = _LOGIN_METHODS_CACHE.get(url.rstrip("/"))
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
 
-    session = HttpSession(url, timeout=timeout)
+    owned = session is None
+    if session is None:
+        session = HttpSession(
+            url, timeout=timeout, proxy=proxy, limits=limits, http2=http2,
+        )
     try:
-        resp = await session.get("logindata", timeout=timeout)
-        return LoginMethods.from_raw(resp.json())
+        return await _fetch_login_methods(
+            session, timeout=timeout, force_refresh=True,
+        )
     finally:
-        await session.close()
+        if owned:
+            await session.close()
+
+
+async def _fetch_login_methods(
+    session: HttpSession,
+    *,
+    timeout: int | httpx.Timeout | None = None,
+    force_refresh: bool = False,
+) -> LoginMethods:
+    """``logindata`` через готовую сессию, с кэшем по ``base_url``."""
+    key = session.base_url
+    if not force_refresh:
+        cached = _LOGIN_METHODS_CACHE.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+    resp = await session.get("logindata", timeout=timeout)
+    methods = LoginMethods.from_raw(session.parse_json(resp))
+    _LOGIN_METHODS_CACHE[key] = (time.monotonic() + _LOGIN_METHODS_TTL, methods)
+    return methods
+
+
+# ═══════════════════════════════════════════════════════════
+#  Параллельный опрос нескольких серверов
+# ═══════════════════════════════════════════════════════════
+
+
+async def _probe_many(
+    urls: List[str],
+    probe: Callable[[str], Any],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Вызвать ``probe(url)`` для всех серверов, не более
+    ``concurrency`` одновременно. Ошибка сервера → ``None``."""
+    if concurrency < 1:
+        raise ValueError("concurrency должен быть не меньше 1")
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(url: str) -> Any:
+        async with sem:
+            try:
+                return await probe(url)
+            except Exception as exc:
+                log.debug("Сервер %s пропущен: %r", url, exc)
+                return None
+
+    # Повторяющиеся адреса опрашиваем один раз
+    unique = list(dict.fromkeys(urls))
+    results = await asyncio.gather(*map(one, unique))
+    return dict(zip(unique, results, strict=True))
+
+
+async def get_login_methods_multi(
+    urls: List[str],
+    *,
+    concurrency: int = 32,
+    timeout: int | httpx.Timeout | None = FAST_PROBE_TIMEOUT,
+) -> Dict[str, Optional[LoginMethods]]:
+    """Узнать способы входа сразу на нескольких серверах.
+
+    Серверы опрашиваются параллельно (не более ``concurrency``
+    одновременно). Недоступный сервер не прерывает опрос — для него
+    возвращается ``None``.
+
+    Args:
+        urls: URL серверов или названия регионов.
+        concurrency: Сколько серверов опрашивать одновременно.
+        timeout: Таймаут на сервер; по умолчанию
+                 :data:`FAST_PROBE_TIMEOUT`.
+
+    Returns:
+        ``{url: LoginMethods | None}`` в порядке ``urls``;
+        повторы опрашиваются один раз.
+
+    Пример::
+
+        from netschoolpy import REGIONS, get_login_methods_multi
+
+        found = await get_login_methods_multi(list(REGIONS.values()))
+        alive = [url for url, methods in found.items() if methods]
+    """
+    return await _probe_many(
+        urls,
+        lambda url: get_login_methods(url, timeout=timeout),
+        concurrency,
+    )
+
+
+async def search_schools_multi(
+    urls: List[str],
+    query: str = "",
+    *,
+    concurrency: int = 32,
+    timeout: int | httpx.Timeout | None = FAST_PROBE_TIMEOUT,
+) -> Dict[str, Optional[List[ShortSchool]]]:
+    """Поиск школы сразу на нескольких серверах.
+
+    Аналог :func:`search_schools` для случая, когда регион неизвестен.
+    Для недоступного сервера возвращается ``None``.
+
+    Args:
+        urls: URL серверов или названия регионов.
+        query: Часть названия школы.
+        concurrency: Сколько серверов опрашивать одновременно.
+        timeout: Таймаут на сервер; по умолчанию
+                 :data:`FAST_PROBE_TIMEOUT`.
+
+    Returns:
+        ``{url: [ShortSchool, ...] | None}`` в порядке ``urls``;
+        повторы опрашиваются один раз.
+    """
+    return await _probe_many(
+        urls,
+        lambda url: search_schools(url, query, timeout=timeout),
+        concurrency,
+    )
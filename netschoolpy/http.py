@@ -3,13 +3,31 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
-from typing import Any, Optional
+from typing import Any, BinaryIO, Callable, Iterable, Optional
 
 import httpx
 
 from netschoolpy.exceptions import ServerUnavailable
 
+try:
+    # Опционально: pip install netschoolpy[fast]
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - orjson не установлен
+    _orjson = None
+
+if _orjson is not None:
+    _json_loads = _orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return _orjson.dumps(obj).decode()
+else:  # pragma: no cover
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
 log = logging.getLogger(__name__)
 
 _DEFAULT_TIMEOUT = 5   # секунд (прямое соединение)
@@ -18,10 +36,29 @@ _TOR_TIMEOUT = 30      # секунд (Tor медленнее)
 # SOCKS5-прокси Tor (локальный, поднятый системой)
 _TOR_PROXY = "socks5://127.0.0.1:9050"
 
+# Сколько секунд держать простаивающее соединение в пуле
+# (у httpx по умолчанию 5 с — слишком мало для периодического опроса)
+_KEEPALIVE_EXPIRY = 15.0
+
+# Размер куска при потоковом скачивании (download)
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Таймаут для быстрого опроса серверов: недоступный хост отсекается
+# за секунду на этапе соединения, медленному ответу даётся 5 секунд
+FAST_PROBE_TIMEOUT = httpx.Timeout(connect=1.0, read=5.0, write=5.0, pool=1.0)
+
 # Кэш хостов, для которых прямое соединение не работает → нужен Tor
 _tor_hosts: set[str] = set()
 
 
+def _total_seconds(timeout: httpx.Timeout) -> float | None:
+    """Верхняя граница на весь запрос для поэтапного ``httpx.Timeout``."""
+    parts = (timeout.connect, timeout.read, timeout.write, timeout.pool)
+    if None in parts:
+        return None
+    return sum(parts)
+
+
 class HttpSession:
     """Тонкая обёртка вокруг ``httpx.AsyncClient``.
 
@@ -30,15 +67,37 @@ class HttpSession:
       через Tor (socks5://127.0.0.1:9050), если он доступен.
       Полезно для региональных серверов СГО, блокирующих datacenter IP.
     • Если общий таймаут ``timeout`` исчерпан — бросает ``ServerUnavailable``.
+      В методы можно передать и ``httpx.Timeout`` с отдельными таймаутами
+      на соединение и чтение (см. ``FAST_PROBE_TIMEOUT``).
     • ``proxy`` — необязательный SOCKS5/HTTP прокси-URL (например,
       ``socks5://127.0.0.1:1080``). Если задан — все запросы идут через него
       (Tor-fallback отключается). Полезно для индивидуального решения с VLESS.
+    • ``json_loads`` — функция разбора JSON для :meth:`parse_json`.
+      По умолчанию — ``orjson.loads``, если orjson установлен,
+      иначе ``json.loads``.
+    • ``keepalive_expiry`` — сколько секунд простаивающее соединение
+      остаётся в пуле (по умолчанию 15).
+    • ``limits`` — готовые ``httpx.Limits`` для пула соединений
+      (перекрывают ``keepalive_expiry``).
+    • ``http2`` — включить HTTP/2 для основного клиента: параллельные
+      запросы идут по одному соединению. Нужен пакет ``h2``
+      (``pip install netschoolpy[http2]``).
     """
 
     def __init__(self, base_url: str, *, timeout: int | None = None,
-                 proxy: str | None = None):
+                 proxy: str | None = None,
+                 json_loads: Callable[[bytes], Any] | None = None,
+                 keepalive_expiry: float = _KEEPALIVE_EXPIRY,
+                 limits: httpx.Limits | None = None,
+                 http2: bool = False):
         self._base_url = base_url.rstrip("/")
         self._external_proxy = proxy
+        self._json_loads = json_loads if json_loads is not None else _json_loads
+        self._limits = limits if limits is not None else httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=keepalive_expiry,
+        )
         self._client = httpx.AsyncClient(
             base_url=f"{self._base_url}/webapi",
             headers={
@@ -46,6 +105,8 @@ class HttpSession:
                 "referer": self._base_url,
             },
             proxy=proxy if proxy else None,
+            limits=self._limits,
+            http2=http2,
             event_hooks={"response": [self._check_status]},
         )
         self._timeout = timeout if timeout is not None else _DEFAULT_TIMEOUT
@@ -56,11 +117,20 @@ class HttpSession:
     def base_url(self) -> str:
         return self._base_url
 
+    @property
+    def limits(self) -> httpx.Limits:
+        """Лимиты пула соединений."""
+        return self._limits
+
     @property
     def client(self) -> httpx.AsyncClient:
         """Прямой доступ к ``httpx.AsyncClient`` (для куки и т.п.)."""
         return self._client
 
+    def parse_json(self, response: httpx.Response) -> Any:
+        """Разобрать тело ответа заданной функцией ``json_loads``."""
+        return self._json_loads(response.content)
+
     # ── удобные мутаторы ─────────────────────────────────────
 
     def set_header(self, key: str, value: str) -> None:
@@ -72,14 +142,20 @@ class HttpSession:
     def set_cookie(self, name: str, value: str) -> None:
         self._client.cookies.set(name, value)
 
+    def update_cookies(self, pairs: Iterable[tuple[str, str]]) -> None:
+        """Добавить несколько кук (``(имя, значение)``) за один вызов."""
+        cookies = self._client.cookies
+        for name, value in pairs:
+            cookies.set(name, value)
+
     # ── HTTP-методы ──────────────────────────────────────────
 
     async def get(
         self,
         path: str,
         *,
-        params: dict[str, Any] | None = None,
-        timeout: int | None = None,
+        params: dict[str, Any] | httpx.QueryParams | None = None,
+        timeout: int | httpx.Timeout | None = None,
         follow_redirects: bool = False,
     ) -> httpx.Response:
         return await self._send(
@@ -93,22 +169,81 @@ class HttpSession:
         *,
         data: Any | None = None,
         json: Any | None = None,
-        params: dict[str, Any] | None = None,
+        content: bytes | str | None = None,
+        params: dict[str, Any] | httpx.QueryParams | None = None,
         headers: dict[str, str] | None = None,
-        timeout: int | None = None,
+        timeout: int | httpx.Timeout | None = None,
     ) -> httpx.Response:
         return await self._send(
-            "POST", path, data=data, json=json,
+            "POST", path, data=data, json=json, content=content,
             params=params, headers=headers, timeout=timeout,
         )
 
+    async def download(
+        self,
+        path: str,
+        buffer: BinaryIO,
+        *,
+        params: dict[str, Any] | httpx.QueryParams | None = None,
+        timeout: int | httpx.Timeout | None = None,
+        follow_redirects: bool = False,
+        chunk_size: int = _DOWNLOAD_CHUNK_SIZE,
+    ) -> None:
+        """GET с потоковой записью тела ответа в ``buffer``.
+
+        Тело не собирается целиком в памяти: куски по ``chunk_size``
+        байт пишутся в буфер по мере получения. Приём тела ограничен
+        тем же общим таймаутом, что и запрос; зависшая передача
+        заканчивается ``ServerUnavailable``.
+
+        При ошибке посреди передачи seekable-буфер (``BytesIO``, файл)
+        откатывается к позиции до начала записи и обрезается; в потоке
+        без перемотки (pipe, сокет) уже записанная часть остаётся.
+        """
+        resp = await self._send(
+            "GET", path, params=params, timeout=timeout,
+            follow_redirects=follow_redirects, stream=True,
+        )
+        seekable = getattr(buffer, "seekable", None)
+        start = buffer.tell() if seekable is not None and seekable() else None
+
+        async def _copy() -> None:
+            async for chunk in resp.aiter_bytes(chunk_size):
+                buffer.write(chunk)
+
+        try:
+            await asyncio.wait_for(_copy(), self._overall_timeout(timeout))
+        except BaseException as exc:
+            if start is not None:
+                buffer.seek(start)
+                buffer.truncate()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise ServerUnavailable(
+                    "Сервер не передал файл за отведённое время"
+                ) from None
+            raise
+        finally:
+            await resp.aclose()
+
     async def close(self) -> None:
-        await self._client.aclose()
         if hasattr(self, "_tor_client"):
-            await self._tor_client.aclose()
+            # Закрываем оба пула параллельно
+            await asyncio.gather(
+                self._client.aclose(), self._tor_client.aclose(),
+            )
+        else:
+            await self._client.aclose()
 
     # ── внутренняя механика ──────────────────────────────────
 
+    def _overall_timeout(
+        self, timeout: int | httpx.Timeout | None,
+    ) -> float | None:
+        """Общий таймаут запроса в секундах (``None`` — без ограничения)."""
+        if isinstance(timeout, httpx.Timeout):
+            return _total_seconds(timeout)
+        return timeout if timeout is not None else self._timeout
+
     def _get_active_client(self) -> httpx.AsyncClient:
         """Возвращает Tor-клиент если хост заблокирован, иначе обычный."""
         import httpx as _httpx
@@ -123,6 +258,7 @@ class HttpSession:
                         "referer": host,
                     },
                     proxy=_TOR_PROXY,
+                    limits=self._limits,
                     event_hooks={"response": [self._check_status]},
                 )
             return self._tor_client
@@ -133,11 +269,15 @@ class HttpSession:
         method: str,
         path: str,
         *,
-        timeout: int | None = None,
+        timeout: int | httpx.Timeout | None = None,
         follow_redirects: bool = False,
+        stream: bool = False,
         **kwargs: Any,
     ) -> httpx.Response:
-        direct_timeout = timeout if timeout is not None else self._timeout
+        if isinstance(timeout, httpx.Timeout):
+            # Поэтапные таймауты отдаёт httpx, общий — их сумма
+            kwargs["timeout"] = timeout
+        direct_timeout = self._overall_timeout(timeout)
         max_5xx_retries = 3
 
         async def _do_request(client: httpx.AsyncClient) -> httpx.Response:
@@ -148,7 +288,9 @@ class HttpSession:
                         method, path,
                         **{k: v for k, v in kwargs.items() if v is not None},
                     )
-                    return await client.send(req, follow_redirects=follow_redirects)
+                    return await client.send(
+                        req, stream=stream, follow_redirects=follow_redirects,
+                    )
                 except httpx.ReadTimeout:
                     await asyncio.sleep(0.1)
                 except httpx.HTTPStatusError as exc:
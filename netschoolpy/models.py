@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import datetime
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Union
 
 
 def _parse_date(value: Any) -> datetime.date:
@@ -49,7 +49,7 @@ def _parse_time(value: Any) -> datetime.time:
 
 # ──────────────────────────── Вложения ────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Attachment:
     id: int
     name: str
@@ -69,7 +69,7 @@ class Attachment:
 
 # ───────────────────────────── Автор ──────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Author:
     id: int
     full_name: str
@@ -86,7 +86,7 @@ class Author:
 
 # ─────────────────────────── Объявления ───────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Announcement:
     name: str
     author: Author
@@ -109,7 +109,17 @@ class Announcement:
 
 # ─────────────────────────── Задания ─────────────────────────────
 
-@dataclass(frozen=True)
+class AssignmentType(NamedTuple):
+    """Тип задания из справочника ``grade/assignment/types``."""
+    name: str
+    abbr: str = ""
+
+
+# Справочник типов: {id: AssignmentType}; dict/str — старые форматы
+TypeMapping = Dict[int, Union[AssignmentType, dict, str]]
+
+
+@dataclass(frozen=True, slots=True)
 class Assignment:
     id: int
     comment: str
@@ -126,7 +136,7 @@ class Assignment:
     def from_raw(
         cls,
         data: dict,
-        type_mapping: Dict[int, dict] | None = None,
+        type_mapping: TypeMapping | None = None,
     ) -> Assignment:
         """Собирает ``Assignment`` из «сырого» JSON SGO.
 
@@ -149,12 +159,18 @@ class Assignment:
         comment = mark_comment["name"] if isinstance(mark_comment, dict) and "name" in mark_comment else ""
 
         kind_id = data.get("typeId", 0)
-        type_info = (type_mapping or {}).get(kind_id, {})
-        if isinstance(type_info, str):
+        type_info = (type_mapping or {}).get(kind_id)
+        if type_info is None:
+            kind = str(kind_id)
+            kind_abbr = ""
+        elif isinstance(type_info, AssignmentType):
+            kind, kind_abbr = type_info
+        elif isinstance(type_info, str):
             # обратная совместимость: старый формат {id: name}
             kind = type_info
             kind_abbr = ""
         else:
+            # обратная совместимость: {id: {"name": ..., "abbr": ...}}
             kind = type_info.get("name", str(kind_id))
             kind_abbr = type_info.get("abbr", "")
 
@@ -174,7 +190,7 @@ class Assignment:
 
 # ──────────────────────────── Уроки ──────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Lesson:
     day: datetime.date
     start: datetime.time
@@ -185,7 +201,7 @@ class Lesson:
     assignments: List[Assignment] = field(default_factory=list)
 
     @classmethod
-    def from_raw(cls, data: dict, type_mapping: Dict[int, dict] | None = None) -> Lesson:
+    def from_raw(cls, data: dict, type_mapping: TypeMapping | None = None) -> Lesson:
         return cls(
             day=_parse_date(data["day"]),
             start=_parse_time(data["startTime"]),
@@ -202,13 +218,13 @@ class Lesson:
 
 # ──────────────────────────── День ───────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Day:
     day: datetime.date
     lessons: List[Lesson]
 
     @classmethod
-    def from_raw(cls, data: dict, type_mapping: Dict[int, dict] | None = None) -> Day:
+    def from_raw(cls, data: dict, type_mapping: TypeMapping | None = None) -> Day:
         return cls(
             day=_parse_date(data["date"]),
             lessons=[Lesson.from_raw(l, type_mapping) for l in data.get("lessons", [])],
@@ -217,14 +233,14 @@ class Day:
 
 # ─────────────────────────── Дневник ─────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Diary:
     start: datetime.date
     end: datetime.date
     schedule: List[Day]
 
     @classmethod
-    def from_raw(cls, data: dict, type_mapping: Dict[int, dict] | None = None) -> Diary:
+    def from_raw(cls, data: dict, type_mapping: TypeMapping | None = None) -> Diary:
         return cls(
             start=_parse_date(data["weekStart"]),
             end=_parse_date(data["weekEnd"]),
@@ -234,7 +250,7 @@ class Diary:
 
 # ─────────────────────────── Школы ───────────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ShortSchool:
     name: str
     id: int
@@ -251,7 +267,7 @@ class ShortSchool:
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class School:
     name: str
     about: str
@@ -294,7 +310,7 @@ class School:
 
 # ─────────────────────────── Способы входа ───────────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LoginMethods:
     """Доступные способы авторизации на сервере SGO.
 
@@ -370,7 +386,7 @@ class LoginMethods:
 
 # ─────────────────────────── Почта / сообщения ─────────────────────
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MailEntry:
     """Краткая запись о письме (из списка/реестра)."""
     id: int
@@ -390,7 +406,7 @@ class MailEntry:
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MailPage:
     """Страница списка писем из реестра."""
     entries: List[MailEntry]
@@ -406,7 +422,7 @@ class MailPage:
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MailRecipient:
     """Получатель письма / контакт."""
     id: str  # base64-кодированный идентификатор
@@ -422,7 +438,7 @@ class MailRecipient:
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Message:
     """Письмо внутренней почты SGO."""
     id: int
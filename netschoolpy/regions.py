@@ -15,6 +15,8 @@
 
 from __future__ import annotations
 
+import functools
+
 __all__ = ["REGIONS", "get_url", "list_regions"]
 
 
@@ -55,6 +57,7 @@ def list_regions() -> list[str]:
     return sorted(REGIONS)
 
 
+@functools.lru_cache(maxsize=256)
 def get_url(query: str) -> str | None:
     """Ищет URL по точному или частичному названию региона.
 
@@ -62,6 +65,10 @@ def get_url(query: str) -> str | None:
     ровно одного ключа — он будет возвращён.  При неоднозначности
     возвращается ``None``.
 
+    Результаты кэшируются: справочник не меняется после импорта.
+    Если вы всё же правите ``REGIONS`` в рантайме — вызовите
+    ``get_url.cache_clear()``.
+
     >>> get_url("Челябинская область")
     'https://sgo.edu-74.ru'
     >>> get_url("челябинская")
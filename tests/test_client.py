@@ -1,10 +1,24 @@
 """Тесты клиентских утилит (cookies, session store, exceptions)."""
 
+import asyncio
+import datetime
+import gc
+import io
 import json
+import weakref
+from types import SimpleNamespace
 
+import httpx
 import pytest
 
-from netschoolpy import NetSchool
+from netschoolpy import (
+    FAST_PROBE_TIMEOUT,
+    HttpSession,
+    NetSchool,
+    get_login_methods_multi,
+    search_schools_multi,
+)
+from netschoolpy import client as client_mod
 from netschoolpy.client import get_login_methods, search_schools
 from netschoolpy.exceptions import (
     ESIAError,
@@ -12,6 +26,7 @@ from netschoolpy.exceptions import (
     MFAError,
     NetSchoolError,
     SchoolNotFound,
+    ServerUnavailable,
     SessionExpired,
 )
 
@@ -57,9 +72,28 @@ class TestExtractAccessToken:
         )
         assert token == "fallback-tok"
 
+    def test_active_entry_after_inactive(self):
+        payload = [
+            {"accessToken": "first-tok"},
+            {"active": True, "accessToken": "active-tok"},
+        ]
+        token = NetSchool._extract_access_token_from_session_store(
+            json.dumps(payload),
+        )
+        assert token == "active-tok"
+
+    def test_stringified_plain_string(self):
+        token = NetSchool._extract_access_token_from_session_store(
+            json.dumps("plain"),
+        )
+        assert token is None
+
     def test_invalid_json(self):
         assert NetSchool._extract_access_token_from_session_store("not json") is None
 
+    def test_non_string_input(self):
+        assert NetSchool._extract_access_token_from_session_store(None) is None
+
     def test_empty_list(self):
         assert NetSchool._extract_access_token_from_session_store("[]") is None
 
@@ -136,6 +170,11 @@ class TestExceptions:
 
 
 class TestNetSchoolRepr:
+    def test_no_instance_dict(self):
+        ns = NetSchool.__new__(NetSchool)
+        assert not hasattr(ns, "__dict__")
+        assert weakref.ref(ns)() is ns
+
     def test_repr_default(self):
         ns = NetSchool.__new__(NetSchool)
         ns._http = type("H", (), {"base_url": "https://sgo.example.ru/webapi"})()
@@ -144,6 +183,13 @@ class TestNetSchoolRepr:
         assert "NetSchool" in r
         assert "sgo.example.ru" in r
 
+    @pytest.mark.asyncio
+    async def test_gosuslugi_auth_url(self):
+        ns = NetSchool("https://sgo.example.ru/")
+        url = await ns.get_gosuslugi_auth_url()
+        assert url == "https://sgo.example.ru/sso/esia/crosslogin"
+        await ns.close(logout=False)
+
 
 # ═══════════════════════════════════════════════════════════
 #  Session export
@@ -218,4 +264,1460 @@ class TestGetLoginMethodsArgs:
         """УРЛ начинающийся с http(s):// не проходит через get_url."""
         with pytest.raises(Exception) as exc_info:
             await get_login_methods("https://127.0.0.1:1", timeout=1)
-        assert not isinstance(exc_info.value, ValueError)
\ No newline at end of file
+        assert not isinstance(exc_info.value, ValueError)
+
+# ═══════════════════════════════════════════════════════════
+#  Переиспользование HttpSession
+# ═══════════════════════════════════════════════════════════
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.content = json.dumps(payload).encode()
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    base_url = "https://sgo.example.ru"
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls: list[str] = []
+        self.closed = False
+
+    async def get(self, path, **kw):
+        self.calls.append(path)
+        return _FakeResponse(self.payload)
+
+    async def close(self):
+        self.closed = True
+
+    def parse_json(self, response):
+        return response.json()
+
+
+@pytest.fixture
+async def swap_http():
+    """Подменить ``ns._http`` фейковой сессией.
+
+    Настоящая сессия возвращается на место и закрывается после теста,
+    даже если он упал.
+    """
+    swapped = []
+
+    def swap(ns, session):
+        swapped.append((ns, ns._http))
+        ns._http = session
+        return session
+
+    yield swap
+    for ns, real_http in reversed(swapped):
+        ns._http = real_http
+        await real_http.close()
+
+
+class TestSharedSession:
+    @pytest.fixture(autouse=True)
+    def _empty_login_methods_cache(self, monkeypatch):
+        monkeypatch.setattr(client_mod, "_LOGIN_METHODS_CACHE", {})
+
+    @pytest.mark.asyncio
+    async def test_search_schools_uses_given_session(self):
+        session = _FakeSession(
+            [{"id": 1, "shortName": "Лицей", "name": "Лицей (г. Саранск)"}],
+        )
+        schools = await search_schools(
+            "https://sgo.example.ru", "Лицей", session=session,
+        )
+        assert [s.id for s in schools] == [1]
+        assert session.calls == ["schools/search"]
+        assert not session.closed
+
+    @pytest.mark.asyncio
+    async def test_get_login_methods_uses_given_session(self):
+        session = _FakeSession({"version": "5.47.0", "productName": "СГО"})
+        methods = await get_login_methods(
+            "https://sgo.example.ru", session=session,
+        )
+        assert methods.version == "5.47.0"
+        assert session.calls == ["logindata"]
+        assert not session.closed
+
+    @pytest.mark.asyncio
+    async def test_owned_session_gets_pool_options(self, monkeypatch):
+        created = []
+
+        def fake_session(url, **kw):
+            created.append(kw)
+            return _FakeSession({"version": "5.47.0"})
+
+        monkeypatch.setattr(client_mod, "HttpSession", fake_session)
+        limits = httpx.Limits(max_connections=8)
+        await get_login_methods(
+            "https://sgo.example.ru", limits=limits, http2=True,
+        )
+        assert created[0]["limits"] is limits
+        assert created[0]["http2"] is True
+
+    @pytest.mark.asyncio
+    async def test_login_methods_cached_per_server(self):
+        session = _FakeSession({"version": "5.47.0"})
+        url = "https://sgo.example.ru"
+        first = await get_login_methods(url, session=session)
+        second = await get_login_methods(url + "/", session=session)
+        assert second is first
+        assert session.calls == ["logindata"]
+
+        await get_login_methods(url, session=session, force_refresh=True)
+        assert session.calls == ["logindata", "logindata"]
+
+    @pytest.mark.asyncio
+    async def test_netschool_keeps_given_session_open(self):
+        session = HttpSession("https://sgo.example.ru")
+        ns = NetSchool("https://sgo.example.ru", session=session)
+        assert ns._http is session
+        await ns.close(logout=False)
+        assert not session.client.is_closed
+        await session.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  Общий ESIA-клиент
+# ═══════════════════════════════════════════════════════════
+
+
+class TestEsiaClient:
+    @pytest.mark.asyncio
+    async def test_reused_and_cookies_cleared(self):
+        ns = NetSchool("https://sgo.example.ru")
+        first = ns._get_esia_client()
+        first.cookies.set("ESIA_SESSION", "old")
+        second = ns._get_esia_client(timeout=10)
+        assert second is first
+        assert "ESIA_SESSION" not in second.cookies
+        await ns.close(logout=False)
+        assert first.is_closed
+        assert ns._esia_client is None
+
+    @pytest.mark.asyncio
+    async def test_closed_on_logout(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({"auth/logout": None}))
+        client = ns._get_esia_client()
+        await ns.logout()
+        assert client.is_closed
+        assert ns._esia_client is None
+        assert ns._http.calls == ["auth/logout"]
+
+
+# ═══════════════════════════════════════════════════════════
+#  Переавторизация по хешу пароля
+# ═══════════════════════════════════════════════════════════
+
+
+class TestRelogin:
+    @pytest.mark.asyncio
+    async def test_relogin_reuses_hash(self, monkeypatch):
+        ns = NetSchool("https://sgo.example.ru")
+        calls = []
+
+        async def fake_login_hashed(self, *args, **kw):
+            calls.append(args)
+
+        monkeypatch.setattr(NetSchool, "_login_hashed", fake_login_hashed)
+        await ns.login("user", "пароль", 42)
+        ns._credentials = calls[0]
+        await ns._relogin()
+
+        user, pw_hash, pw_len, school = calls[0]
+        assert (user, pw_len, school) == ("user", 6, 42)
+        assert pw_hash == b"749789e4982b0c563f6729aac100a614"
+        assert calls[1] == calls[0]
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  _mirror_set_cookies
+# ═══════════════════════════════════════════════════════════
+
+
+class TestMirrorSetCookies:
+    @pytest.mark.asyncio
+    async def test_domainless_copies(self):
+        client = httpx.AsyncClient()
+        response = httpx.Response(
+            302,
+            headers=[
+                ("set-cookie", "NSSESSIONID=abc; Path=/; HttpOnly"),
+                ("set-cookie", "broken-cookie"),
+                ("set-cookie", "ESIA_SESSION=x=y; Secure"),
+            ],
+        )
+        NetSchool._mirror_set_cookies(client, response)
+        jar = {c.name: (c.value, c.domain) for c in client.cookies.jar}
+        assert jar == {
+            "NSSESSIONID": ("abc", ""),
+            "ESIA_SESSION": ("x=y", ""),
+        }
+        await client.aclose()
+
+
+# ═══════════════════════════════════════════════════════════
+#  Кэш ID школ
+# ═══════════════════════════════════════════════════════════
+
+
+class TestResolveSchoolCache:
+    @pytest.mark.asyncio
+    async def test_second_lookup_skips_network(self, monkeypatch, swap_http):
+        monkeypatch.setattr(client_mod, "_SCHOOL_ID_CACHE", {})
+        ns = NetSchool("https://sgo.example.ru")
+        fake = _FakeSession([{"id": 7, "shortName": "Лицей", "name": "Лицей"}])
+        swap_http(ns, fake)
+
+        assert await ns._resolve_school("Лицей") == 7
+        assert await ns._resolve_school("Лицей") == 7
+        assert fake.calls == ["schools/search"]
+
+        ns._forget_school("Лицей")
+        assert await ns._resolve_school("Лицей") == 7
+        assert len(fake.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_casefold_and_priority(self, monkeypatch, swap_http):
+        monkeypatch.setattr(client_mod, "_SCHOOL_ID_CACHE", {})
+        ns = NetSchool("https://sgo.example.ru")
+        fake = _FakeSession([
+            {"id": 1, "shortName": "МОУ СОШ №1", "name": "Гимназия (г. Саранск)"},
+            {"id": 2, "shortName": "Гимназия", "name": "Гимназия №2"},
+            {"id": 3, "shortName": "мou", "name": "МОУ  СОШ №1 (г. Рузаевка)"},
+        ])
+        swap_http(ns, fake)
+
+        # shortName важнее name, регистр и пробелы не учитываются
+        assert await ns._resolve_school("гимназия") == 2
+        assert await ns._resolve_school("  моу сош  №1 ") == 1
+        with pytest.raises(SchoolNotFound):
+            await ns._resolve_school("Лицей")
+
+
+# ═══════════════════════════════════════════════════════════
+#  Адаптивный keep-alive
+# ═══════════════════════════════════════════════════════════
+
+
+class TestAdaptiveKeepalive:
+    @staticmethod
+    def _set_session_cookie(ns, header):
+        request = httpx.Request("GET", "https://sgo.example.ru/webapi/context")
+        response = httpx.Response(
+            200, headers=[("set-cookie", header)], request=request,
+        )
+        ns._http.client.cookies.extract_cookies(response)
+
+    @pytest.mark.asyncio
+    async def test_interval_follows_cookie_expiry(self):
+        ns = NetSchool("https://sgo.example.ru")
+        self._set_session_cookie(ns, "NSSESSIONID=abc; Max-Age=1800; Path=/")
+        ns._adapt_keepalive_interval()
+        assert 1200 <= ns._keepalive_interval <= 1260
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_session_cookie_keeps_default(self):
+        ns = NetSchool("https://sgo.example.ru")
+        self._set_session_cookie(ns, "NSSESSIONID=abc; Path=/")
+        ns._adapt_keepalive_interval()
+        assert ns._keepalive_interval == 300
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_connection_warming_between_pings(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        session = swap_http(ns, _RoutedSession({"logindata": {}, "context": {}}))
+        ns.set_keepalive_interval(3600)
+        ns.set_connection_warming(0.01)
+        ns._start_keepalive()
+        await asyncio.sleep(0.05)
+        ns._stop_keepalive()
+        assert session.calls.count("logindata") >= 2
+        assert "context" not in session.calls
+
+    @pytest.mark.asyncio
+    async def test_no_warming_ping_when_disabled(self, monkeypatch, swap_http):
+        # Таймер сработал «раньше» срока: без прогрева всё равно пингуем context
+        monkeypatch.setattr(
+            client_mod, "time", SimpleNamespace(monotonic=lambda: 1000.0),
+        )
+        ns = NetSchool("https://sgo.example.ru")
+        session = swap_http(ns, _RoutedSession({"logindata": {}, "context": {}}))
+        ns.set_keepalive_interval(0.01)
+        ns._start_keepalive()
+        await asyncio.sleep(0.05)
+        ns._stop_keepalive()
+        assert session.calls.count("context") >= 2
+        assert "logindata" not in session.calls
+
+    @pytest.mark.asyncio
+    async def test_connection_warming_default_follows_pool(self):
+        ns = NetSchool("https://sgo.example.ru")
+        ns.set_connection_warming()
+        assert ns._warm_interval == 10.0  # keepalive_expiry 15 с − 2, не больше 10
+        ns.set_connection_warming(0)
+        assert ns._warm_interval == 0
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_explicit_interval_disables_adaptation(self):
+        ns = NetSchool("https://sgo.example.ru")
+        ns.set_keepalive_interval(120)
+        self._set_session_cookie(ns, "NSSESSIONID=abc; Max-Age=1800; Path=/")
+        ns._adapt_keepalive_interval()
+        assert ns._keepalive_interval == 120
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  _pick_esia_user
+# ═══════════════════════════════════════════════════════════
+
+
+class TestPickEsiaUser:
+    USERS = [
+        {"id": 1, "displayName": "МБОУ СОШ №1"},
+        {"id": 2, "name": "ГИМНАЗИЯ «ЁЛОЧКА»"},
+    ]
+
+    def test_single_user(self):
+        assert NetSchool._pick_esia_user(self.USERS[:1]) is self.USERS[0]
+
+    def test_case_insensitive_match(self):
+        user = NetSchool._pick_esia_user(self.USERS, "гимназия «ёлочка»")
+        assert user["id"] == 2
+
+    def test_not_found(self):
+        with pytest.raises(LoginError, match="Доступные"):
+            NetSchool._pick_esia_user(self.USERS, "Лицей")
+
+
+# ═══════════════════════════════════════════════════════════
+#  Цепочка callback → loginState
+# ═══════════════════════════════════════════════════════════
+
+
+class TestEsiaCallbackChain:
+    @pytest.mark.asyncio
+    async def test_login_state_from_redirect_history(self):
+        state = "0a1b2c3d-0000-1111-2222-333344445555"
+
+        def handler(request):
+            if request.url.path == "/callback":
+                return httpx.Response(
+                    302,
+                    headers={
+                        "location": f"https://sgo.example.ru/app?loginState={state}",
+                        "set-cookie": "NSSESSIONID=sgo; Path=/",
+                    },
+                )
+            return httpx.Response(200, text="ok")
+
+        ns = NetSchool("https://sgo.example.ru")
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        login_state = await ns._esia_callback_to_login_state(
+            client, "https://esia.example.ru/callback",
+        )
+        assert login_state == state
+        assert any(
+            c.name == "NSSESSIONID" and not c.domain for c in client.cookies.jar
+        )
+        assert client.event_hooks["response"] == []
+        await client.aclose()
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_mirrored_cookie_sent_on_next_hop(self):
+        seen = []
+
+        def handler(request):
+            if request.url.host == "esia.example.ru":
+                return httpx.Response(
+                    302,
+                    headers={
+                        "location": "https://sgo.example.ru/next",
+                        "set-cookie": "ESIA_X=1; Path=/",
+                    },
+                )
+            seen.append(request.headers.get("cookie"))
+            return httpx.Response(200, text="ok")
+
+        ns = NetSchool("https://sgo.example.ru")
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        response = await ns._esia_follow(client, "https://esia.example.ru/start")
+        assert str(response.url) == "https://sgo.example.ru/next"
+        assert len(response.history) == 1
+        assert seen == ["ESIA_X=1"]
+        await client.aclose()
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_redirect_loop_raises(self):
+        def handler(request):
+            return httpx.Response(302, headers={"location": "/loop"})
+
+        ns = NetSchool("https://sgo.example.ru")
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), max_redirects=3,
+        )
+        with pytest.raises(ESIAError, match="редиректов"):
+            await ns._esia_follow(client, "https://esia.example.ru/loop")
+        await client.aclose()
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  _poll_esia_qr_sse
+# ═══════════════════════════════════════════════════════════
+
+
+class _FakeWriter:
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+class TestPollEsiaQrSse:
+    @staticmethod
+    def _patch_connection(monkeypatch, raw: bytes):
+        async def fake_open_connection(host, port, ssl=None):
+            reader = asyncio.StreamReader()
+            reader.feed_data(raw)
+            reader.feed_eof()
+            return reader, _FakeWriter()
+
+        monkeypatch.setattr(
+            client_mod.asyncio, "open_connection", fake_open_connection,
+        )
+
+    @pytest.mark.asyncio
+    async def test_returns_first_data_event(self, monkeypatch):
+        self._patch_connection(
+            monkeypatch,
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n\r\n"
+            b": ping\n\n"
+            b'data: {"redirect_url": "https://esia.example.ru/cb"}\n\n',
+        )
+        async with httpx.AsyncClient() as client:
+            data = await NetSchool._poll_esia_qr_sse(
+                client, "https://esia.example.ru/qr/sse", timeout=1,
+            )
+        assert data == {"redirect_url": "https://esia.example.ru/cb"}
+
+    @pytest.mark.asyncio
+    async def test_event_split_across_reads(self, monkeypatch):
+        class _ChunkedReader:
+            def __init__(self, chunks):
+                self._chunks = list(chunks)
+
+            async def readline(self):
+                return self._chunks.pop(0)
+
+            async def read(self, n):
+                return self._chunks.pop(0) if self._chunks else b""
+
+        async def fake_open_connection(host, port, ssl=None):
+            return _ChunkedReader([
+                b"HTTP/1.1 200 OK\r\n",
+                b"Content-Type: text/event-stream\r\n\r\n: pi",
+                b"ng\n\ndata: {\"redirect",
+                b"_url\": \"https://esia.e",
+                b"xample.ru/cb\"}",
+                b"\n\n",
+            ]), _FakeWriter()
+
+        monkeypatch.setattr(
+            client_mod.asyncio, "open_connection", fake_open_connection,
+        )
+        async with httpx.AsyncClient() as client:
+            data = await NetSchool._poll_esia_qr_sse(
+                client, "https://esia.example.ru/qr/sse", timeout=1,
+            )
+        assert data == {"redirect_url": "https://esia.example.ru/cb"}
+
+    @pytest.mark.asyncio
+    async def test_non_200_fails_fast(self, monkeypatch):
+        self._patch_connection(
+            monkeypatch, b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n",
+        )
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(ESIAError, match="404"):
+                await NetSchool._poll_esia_qr_sse(
+                    client, "https://esia.example.ru/qr/sse", timeout=1,
+                )
+
+
+# ═══════════════════════════════════════════════════════════
+#  _extract_redirect_url
+# ═══════════════════════════════════════════════════════════
+
+
+class TestExtractRedirectUrl:
+    def test_top_level_key(self):
+        data = {"redirectUrl": "https://a", "url": "https://b"}
+        assert NetSchool._extract_redirect_url(data) == "https://a"
+
+    def test_nested_data(self):
+        data = {"action": "DONE", "data": {"url": "https://c"}}
+        assert NetSchool._extract_redirect_url(data) == "https://c"
+
+    def test_top_level_wins_over_nested(self):
+        data = {"redirect": "https://a", "data": {"redirect_url": "https://b"}}
+        assert NetSchool._extract_redirect_url(data) == "https://a"
+
+    def test_missing(self):
+        assert NetSchool._extract_redirect_url({"data": "x"}) is None
+
+
+# ═══════════════════════════════════════════════════════════
+#  Пул соединений
+# ═══════════════════════════════════════════════════════════
+
+
+class TestConnectionLimits:
+    @pytest.mark.asyncio
+    async def test_custom_limits(self):
+        limits = httpx.Limits(max_connections=5, keepalive_expiry=60.0)
+        ns = NetSchool("https://sgo.example.ru", limits=limits)
+        assert ns._http._limits is limits
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_structured_timeout_forwarded(self, monkeypatch):
+        monkeypatch.setattr(client_mod, "_LOGIN_METHODS_CACHE", {})
+
+        seen = []
+
+        def handler(request):
+            seen.append(request.extensions["timeout"])
+            return httpx.Response(200, json={"version": "5.47.0"})
+
+        session = HttpSession("https://sgo.example.ru")
+        await session.client.aclose()
+        session._client = httpx.AsyncClient(
+            base_url="https://sgo.example.ru/webapi",
+            transport=httpx.MockTransport(handler),
+        )
+        methods = await get_login_methods(
+            "https://sgo.example.ru", session=session,
+            timeout=FAST_PROBE_TIMEOUT, force_refresh=True,
+        )
+        assert methods.version == "5.47.0"
+        assert seen[0]["connect"] == 1.0
+        assert seen[0]["read"] == 5.0
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_update_cookies(self):
+        session = HttpSession("https://sgo.example.ru")
+        session.update_cookies(iter([("NSSESSIONID", "abc"), ("ESRNSec", "x")]))
+        assert dict(session.client.cookies) == {
+            "NSSESSIONID": "abc", "ESRNSec": "x",
+        }
+        await session.close()
+
+    @pytest.mark.asyncio
+    async def test_http2_opt_in(self):
+        pytest.importorskip("h2")
+        ns = NetSchool("https://sgo.example.ru", http2=True)
+        assert ns._http.client._transport._pool._http2
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  _finish_login
+# ═══════════════════════════════════════════════════════════
+
+
+class _RoutedSession(_FakeSession):
+    """Фейковая сессия: ответ (или исключение) по пути запроса."""
+
+    base_url = "https://sgo.example.ru/webapi"
+
+    def __init__(self, routes):
+        super().__init__(None)
+        self.routes = routes
+
+    async def get(self, path, **kw):
+        self.calls.append(path)
+        result = self.routes[path]
+        if isinstance(result, Exception):
+            raise result
+        return _FakeResponse(result)
+
+    post = get
+
+
+class TestFinishLogin:
+    ROUTES = {
+        "years/current": {"id": 2024},
+        "grade/assignment/types": [{"id": 1, "name": "Контрольная", "abbr": "К"}],
+    }
+
+    @pytest.fixture(autouse=True)
+    def _empty_types_cache(self, monkeypatch):
+        monkeypatch.setattr(client_mod, "_ASSIGNMENT_TYPES_CACHE", {})
+
+    @pytest.mark.asyncio
+    async def test_gather_cancels_siblings_on_error(self):
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.append("slow")
+
+        async def broken():
+            raise RuntimeError("init")
+
+        with pytest.raises(RuntimeError, match="init"):
+            await client_mod._gather_or_cancel(slow(), broken())
+        await asyncio.sleep(0.06)
+        assert finished == []
+
+    @pytest.mark.asyncio
+    async def test_context_failure_is_ignored(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({**self.ROUTES, "context": RuntimeError("x")}))
+        await ns._finish_login()
+        assert ns._year_id == 2024
+        assert ns._assignment_types[1].abbr == "К"
+        assert ns._school_id == -1
+
+    @pytest.mark.asyncio
+    async def test_context_skipped_when_school_known(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        ns._school_id = 5
+        session = swap_http(ns, _RoutedSession(self.ROUTES))
+        await ns._finish_login()
+        assert "context" not in session.calls
+
+    @pytest.mark.asyncio
+    async def test_year_failure_propagates(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession(
+            {**self.ROUTES, "years/current": RuntimeError("down")},
+        ))
+        ns._school_id = 5
+        with pytest.raises(RuntimeError, match="down"):
+            await ns._finish_login()
+
+    @pytest.mark.asyncio
+    async def test_types_cached_when_school_comes_from_context(self, swap_http):
+        routes = {**self.ROUTES, "context": {"schoolId": 5}}
+        first = NetSchool("https://sgo.example.ru")
+        first_session = swap_http(first, _RoutedSession(routes))
+        await first._finish_login()
+        assert first._school_id == 5
+        assert first_session.calls.index("context") < first_session.calls.index(
+            "grade/assignment/types",
+        )
+
+        second = NetSchool("https://sgo.example.ru")
+        second_session = swap_http(second, _RoutedSession(routes))
+        await second._finish_login()
+        assert "grade/assignment/types" not in second_session.calls
+        assert second._assignment_types[1].abbr == "К"
+
+    @pytest.mark.asyncio
+    async def test_assignment_types_cached_per_school(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        ns._school_id = 5
+        session = swap_http(ns, _RoutedSession(self.ROUTES))
+        await ns._finish_login()
+        await ns._finish_login()
+        assert session.calls.count("grade/assignment/types") == 1
+        assert ns._assignment_types[1].name == "Контрольная"
+        # общий для процесса справочник нельзя изменить через клиента
+        with pytest.raises(TypeError):
+            ns._assignment_types[2] = None
+
+    @pytest.mark.asyncio
+    async def test_login_with_token_known_school(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        headers = {}
+
+        class TokenSession(_RoutedSession):
+            def set_header(self, key, value):
+                headers[key] = value
+
+        session = swap_http(ns, TokenSession({
+            **self.ROUTES,
+            "student/diary/init": {
+                "students": [{"studentId": 77}], "currentStudentId": 0,
+            },
+        }))
+        await ns.login_with_token("tok", 5)
+        ns._stop_keepalive()
+        assert headers == {"at": "tok"}
+        assert (ns._student_id, ns._school_id, ns._year_id) == (77, 5, 2024)
+        assert "context" not in session.calls
+
+    @pytest.mark.asyncio
+    async def test_login_with_token_init_failure(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+
+        class SlowYearSession(_RoutedSession):
+            async def get(self, path, **kw):
+                if path == "years/current":
+                    await asyncio.sleep(0.05)
+                return await super().get(path, **kw)
+
+            def set_header(self, key, value):
+                pass
+
+        swap_http(ns, SlowYearSession({
+            **self.ROUTES, "student/diary/init": RuntimeError("init"),
+        }))
+        with pytest.raises(RuntimeError, match="init"):
+            await ns.login_with_token("tok", 5)
+        await asyncio.sleep(0.06)
+        assert ns._year_id == -1
+        assert ns._keepalive_task is None
+
+
+# ═══════════════════════════════════════════════════════════
+#  _poll_esia_push
+# ═══════════════════════════════════════════════════════════
+
+
+class TestPollEsiaPush:
+    @pytest.mark.asyncio
+    async def test_backoff_until_redirect(self, monkeypatch):
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(client_mod.asyncio, "sleep", fake_sleep)
+
+        answers = iter([{"pending": True}] * 3 + [{"redirect_url": "https://cb"}])
+
+        class FakeClient:
+            async def post(self, url, **kw):
+                return _FakeResponse(next(answers))
+
+        ns = NetSchool("https://sgo.example.ru")
+        url = await ns._poll_esia_push(FakeClient(), {}, max_wait=60)
+        assert url == "https://cb"
+        assert delays == sorted(delays)
+        assert delays[0] == 1.0 and max(delays) <= 5.0
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_rejected(self, monkeypatch):
+        async def fake_sleep(delay):
+            pass
+
+        monkeypatch.setattr(client_mod.asyncio, "sleep", fake_sleep)
+
+        class FakeClient:
+            async def post(self, url, **kw):
+                return _FakeResponse({"failed": "DECLINED"})
+
+        ns = NetSchool("https://sgo.example.ru")
+        with pytest.raises(MFAError, match="DECLINED"):
+            await ns._poll_esia_push(FakeClient(), {}, max_wait=60)
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  _handle_esia_post_mfa
+# ═══════════════════════════════════════════════════════════
+
+
+class _RecordingEsiaClient:
+    """Фейковый ESIA-клиент: ответы по URL, журнал запросов."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls: list[tuple[str, str]] = []
+
+    async def _respond(self, method, url):
+        self.calls.append((method, url.rsplit("/login/", 1)[-1]))
+        status, payload = self.routes[url.rsplit("/login/", 1)[-1]]
+        response = _FakeResponse(payload)
+        response.status_code = status
+        response.text = response.content.decode()
+        return response
+
+    async def get(self, url, **kw):
+        return await self._respond("GET", url)
+
+    async def post(self, url, **kw):
+        return await self._respond("POST", url)
+
+
+class TestHandleEsiaPostMfa:
+    @pytest.mark.asyncio
+    async def test_skip_response_used_without_next_step(self):
+        client = _RecordingEsiaClient({
+            "change-password/skip": (
+                200, {"action": "DONE", "redirect_url": "https://cb"},
+            ),
+        })
+        ns = NetSchool("https://sgo.example.ru")
+        url = await ns._handle_esia_post_mfa(
+            client, {"action": "CHANGE_PASSWORD"},
+        )
+        assert url == "https://cb"
+        assert client.calls == [("POST", "change-password/skip")]
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_next_step_when_skip_fails(self):
+        client = _RecordingEsiaClient({
+            "change-password/skip": (500, {}),
+            "next-step": (200, {"action": "DONE", "redirect_url": "https://cb"}),
+        })
+        ns = NetSchool("https://sgo.example.ru")
+        url = await ns._handle_esia_post_mfa(
+            client, {"action": "CHANGE_PASSWORD"},
+        )
+        assert url == "https://cb"
+        assert client.calls[-1] == ("GET", "next-step")
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_max_quiz_not_skippable(self):
+        ns = NetSchool("https://sgo.example.ru")
+        with pytest.raises(ESIAError, match="MAX_QUIZ"):
+            await ns._handle_esia_post_mfa(
+                _RecordingEsiaClient({}),
+                {"action": "MAX_QUIZ", "max_details": {"skippable": False}},
+            )
+        await ns._http.close()
+
+
+class TestHandleEsiaMfaProbe:
+    """Перебор endpoint'ов проверки кода для нестандартных типов MFA."""
+
+    _LOGIN_DATA = {"mfa_details": {"type": "SMS", "otp_details": {}}}
+
+    @pytest.fixture(autouse=True)
+    def _unknown_verify_path(self, monkeypatch):
+        monkeypatch.setattr(client_mod, "_MFA_VERIFY_PATHS", {})
+        monkeypatch.setattr(client_mod, "_MFA_VERIFY_URLS", {})
+
+    @pytest.mark.asyncio
+    async def test_stale_cached_url_falls_back_to_probe(self):
+        base = "https://esia.gosuslugi.ru/aas/oauth2/api/login"
+        client_mod._MFA_VERIFY_URLS["sms"] = f"{base}/sms/verify"
+        client = _RecordingEsiaClient({
+            "sms/verify": (404, {}),
+            "mfa/verify": (404, {}),
+            "otp-sms/verify": (200, {"redirect_url": "https://cb"}),
+        })
+        ns = NetSchool("https://sgo.example.ru")
+        url = await ns._handle_esia_mfa(
+            client, self._LOGIN_DATA, otp_callback=lambda *_: "123456",
+        )
+        assert url == "https://cb"
+        assert [c[1] for c in client.calls] == [
+            "sms/verify", "mfa/verify", "otp-sms/verify",
+        ]
+        assert client_mod._MFA_VERIFY_URLS["sms"] == f"{base}/otp-sms/verify"
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_error_status_not_memoized(self):
+        client = _RecordingEsiaClient({
+            "mfa/verify": (404, {}),
+            "sms/verify": (403, {}),
+        })
+        ns = NetSchool("https://sgo.example.ru")
+        with pytest.raises(MFAError, match="403"):
+            await ns._handle_esia_mfa(
+                client, self._LOGIN_DATA, otp_callback=lambda *_: "123456",
+            )
+        assert "sms" not in client_mod._MFA_VERIFY_URLS
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  week_summary
+# ═══════════════════════════════════════════════════════════
+
+
+class TestWeekSummary:
+    @pytest.mark.asyncio
+    async def test_fetches_both_for_same_week(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        start = datetime.date(2024, 9, 2)
+        session = swap_http(ns, _RoutedSession({
+            "student/diary": {
+                "weekStart": "2024-09-02T00:00:00",
+                "weekEnd": "2024-09-07T00:00:00",
+                "weekDays": [],
+            },
+            "student/diary/pastMandatory": [],
+        }))
+        diary, overdue = await ns.week_summary(start)
+        assert diary.start == start
+        assert overdue == []
+        assert sorted(session.calls) == [
+            "student/diary", "student/diary/pastMandatory",
+        ]
+
+    def test_week_range_defaults(self):
+        start, end = NetSchool._week_range(None, None)
+        assert start.weekday() == 0
+        assert end - start == datetime.timedelta(days=5)
+        assert start <= datetime.date.today() <= start + datetime.timedelta(days=6)
+
+        wed = datetime.date(2024, 9, 4)
+        assert NetSchool._week_range(wed, None) == (wed, datetime.date(2024, 9, 9))
+
+
+# ═══════════════════════════════════════════════════════════
+#  Переавторизация при 401
+# ═══════════════════════════════════════════════════════════
+
+
+def _status_error(code):
+    request = httpx.Request("GET", "https://sgo.example.ru/webapi/x")
+    response = httpx.Response(code, request=request)
+    return httpx.HTTPStatusError("err", request=request, response=response)
+
+
+class TestAuthedSend:
+    @pytest.mark.asyncio
+    async def test_relogin_once_then_success(self, monkeypatch, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        results = [_status_error(401), {"ok": True}]
+        session = swap_http(ns, _RoutedSession({}))
+
+        async def get(path, **kw):
+            session.calls.append(path)
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return _FakeResponse(result)
+
+        session.get = get
+        relogins = []
+
+        async def fake_relogin(self, **kw):
+            relogins.append(1)
+
+        monkeypatch.setattr(NetSchool, "_relogin", fake_relogin)
+        ns._credentials = ("u", b"h", 4, 1)
+
+        resp = await ns._authed_get("context")
+        assert resp.json() == {"ok": True}
+        assert len(relogins) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_401_relogin_once(self, monkeypatch, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        session = swap_http(ns, _RoutedSession({}))
+        relogins = []
+
+        async def get(path, **kw):
+            session.calls.append(path)
+            await asyncio.sleep(0)
+            if not relogins:
+                raise _status_error(401)
+            return _FakeResponse({"ok": True})
+
+        session.get = get
+
+        async def fake_relogin(self, **kw):
+            await asyncio.sleep(0.01)
+            relogins.append(1)
+
+        monkeypatch.setattr(NetSchool, "_relogin", fake_relogin)
+        ns._credentials = ("u", b"h", 4, 1)
+
+        resps = await asyncio.gather(
+            *(ns._authed_get("context") for _ in range(10))
+        )
+        assert [r.json() for r in resps] == [{"ok": True}] * 10
+        assert len(relogins) == 1
+        assert len(session.calls) == 20
+
+    @pytest.mark.asyncio
+    async def test_second_401_raises_session_expired(self, monkeypatch, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({"context": _status_error(401)}))
+
+        async def fake_relogin(self, **kw):
+            pass
+
+        monkeypatch.setattr(NetSchool, "_relogin", fake_relogin)
+        ns._credentials = ("u", b"h", 4, 1)
+
+        with pytest.raises(SessionExpired):
+            await ns._authed_get("context")
+
+    @pytest.mark.asyncio
+    async def test_no_credentials(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({"context": _status_error(401)}))
+        with pytest.raises(SessionExpired):
+            await ns._authed_get("context")
+
+    @pytest.mark.asyncio
+    async def test_other_errors_propagate(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({"context": _status_error(500)}))
+        with pytest.raises(httpx.HTTPStatusError):
+            await ns._authed_get("context")
+
+    @pytest.mark.asyncio
+    async def test_max_inflight_limits_concurrency(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        ns.set_max_inflight(2)
+        active = peak = 0
+
+        class SlowSession(_RoutedSession):
+            async def get(self, path, **kw):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+                return _FakeResponse({})
+
+        swap_http(ns, SlowSession({}))
+        await asyncio.gather(*(ns._authed_get("context") for _ in range(6)))
+        assert peak == 2
+
+    def test_max_inflight_validation(self):
+        ns = NetSchool.__new__(NetSchool)
+        with pytest.raises(ValueError):
+            ns.set_max_inflight(0)
+
+
+# ═══════════════════════════════════════════════════════════
+#  mail_list
+# ═══════════════════════════════════════════════════════════
+
+
+class TestMailList:
+    @pytest.mark.asyncio
+    async def test_registry_body(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        bodies = []
+
+        class CapturingSession(_RoutedSession):
+            async def post(self, path, **kw):
+                bodies.append(json.loads(json.dumps(kw["json"])))
+                return _FakeResponse({"rows": [], "page": 2, "totalItems": 0})
+
+        swap_http(ns, CapturingSession({}))
+        page = await ns.mail_list("Sent", page=2, page_size=10)
+        await ns.mail_list("Custom")
+
+        assert page.page == 2
+        first, second = bodies
+        assert first["filterContext"]["selectedData"][0]["filterText"] == "Отправленные"
+        assert first["filterContext"]["selectedData"][1]["filterValue"] == "All"
+        assert first["fields"] == ["author", "subject", "sent"]
+        assert (first["page"], first["pageSize"]) == (2, 10)
+        assert second["filterContext"]["selectedData"][0]["filterText"] == "Custom"
+
+
+# ═══════════════════════════════════════════════════════════
+#  Потоковое скачивание
+# ═══════════════════════════════════════════════════════════
+
+
+class TestDownload:
+    @staticmethod
+    async def _mock_client(ns, handler):
+        await ns._http.client.aclose()
+        ns._http._client = httpx.AsyncClient(
+            base_url="https://sgo.example.ru/webapi",
+            transport=httpx.MockTransport(handler),
+            event_hooks={"response": [ns._http._check_status]},
+        )
+
+    @pytest.mark.asyncio
+    async def test_attachment_streamed_into_buffer(self):
+        body = bytes(range(256)) * 1024
+        seen = []
+
+        def handler(request):
+            seen.append(request.url.path)
+            return httpx.Response(200, content=body)
+
+        ns = NetSchool("https://sgo.example.ru")
+        await self._mock_client(ns, handler)
+        buffer = io.BytesIO()
+        await ns.download_attachment(5, buffer)
+        assert buffer.getvalue() == body
+        assert seen == ["/webapi/attachments/5"]
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_error_status_writes_nothing(self):
+        ns = NetSchool("https://sgo.example.ru")
+        await self._mock_client(ns, lambda request: httpx.Response(404, content=b"nope"))
+        buffer = io.BytesIO()
+        with pytest.raises(httpx.HTTPStatusError):
+            await ns.download_profile_picture(1, buffer)
+        assert buffer.getvalue() == b""
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_stalled_body_times_out_and_rewinds(self):
+        async def stalled():
+            yield b"partial"
+            await asyncio.sleep(10)
+
+        ns = NetSchool("https://sgo.example.ru")
+        await self._mock_client(ns, lambda request: httpx.Response(200, content=stalled()))
+        buffer = io.BytesIO()
+        buffer.write(b"keep")
+        with pytest.raises(ServerUnavailable):
+            await ns.download_attachment(5, buffer, timeout=0.05)
+        assert buffer.getvalue() == b"keep"
+        assert buffer.tell() == 4
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_broken_stream_truncates_buffer(self):
+        async def broken():
+            yield b"partial"
+            raise httpx.ReadError("reset")
+
+        ns = NetSchool("https://sgo.example.ru")
+        await self._mock_client(ns, lambda request: httpx.Response(200, content=broken()))
+        buffer = io.BytesIO()
+        with pytest.raises(httpx.ReadError):
+            await ns.download_attachment(5, buffer)
+        assert buffer.getvalue() == b""
+        await ns._http.close()
+
+
+# ═══════════════════════════════════════════════════════════
+#  mail_read_many
+# ═══════════════════════════════════════════════════════════
+
+
+class TestMailReadMany:
+    @pytest.mark.asyncio
+    async def test_user_params_follow_student(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        seen = []
+
+        class ParamsSession(_RoutedSession):
+            async def get(self, path, **kw):
+                seen.append(kw["params"])
+                return _FakeResponse({"id": 1, "sent": "2024-09-02T10:00:00"})
+
+        swap_http(ns, ParamsSession({}))
+        ns._assign_student({
+            "students": [{"studentId": 555}], "currentStudentId": 0,
+        })
+        await ns.mail_read(1)
+        assert str(seen[0]) == "userId=555"
+
+    @pytest.mark.asyncio
+    async def test_order_and_concurrency(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        active = peak = 0
+
+        class SlowSession(_RoutedSession):
+            async def get(self, path, **kw):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                message_id = int(path.split("/")[2])
+                await asyncio.sleep(0.01 * (5 - message_id))
+                active -= 1
+                return _FakeResponse({"id": message_id, "sent": "2024-09-02T10:00:00"})
+
+        swap_http(ns, SlowSession({}))
+        messages = await ns.mail_read_many([1, 2, 3, 4], concurrency=2)
+        assert [m.id for m in messages] == [1, 2, 3, 4]
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_reads_share_request(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+
+        class SlowSession(_RoutedSession):
+            async def get(self, path, **kw):
+                self.calls.append(path)
+                await asyncio.sleep(0.01)
+                return _FakeResponse({"id": 7, "sent": "2024-09-02T10:00:00"})
+
+        session = swap_http(ns, SlowSession({}))
+        first, second = await asyncio.gather(ns.mail_read(7), ns.mail_read(7))
+        assert first is second
+        assert session.calls == ["mail/messages/7/read"]
+        assert ns._mail_reads == {}
+
+        await ns.mail_read(7)
+        assert len(session.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_without_waiters_is_retrieved(self, swap_http):
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda _loop, context: errors.append(context))
+        ns = NetSchool("https://sgo.example.ru")
+
+        class FailingSession(_RoutedSession):
+            async def get(self, path, **kw):
+                await asyncio.sleep(0.01)
+                raise RuntimeError("down")
+
+        swap_http(ns, FailingSession({}))
+        try:
+            waiter = asyncio.ensure_future(ns.mail_read(7))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            await asyncio.sleep(0.02)
+            gc.collect()
+            assert errors == []
+            assert ns._mail_reads == {}
+        finally:
+            loop.set_exception_handler(None)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_keeps_shared_request(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+
+        class SlowSession(_RoutedSession):
+            async def get(self, path, **kw):
+                await asyncio.sleep(0.02)
+                return _FakeResponse({"id": 7, "sent": "2024-09-02T10:00:00"})
+
+        swap_http(ns, SlowSession({}))
+        waiter = asyncio.ensure_future(ns.mail_read(7))
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(ns.mail_read(7))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        message = await other
+        assert message.id == 7
+
+
+# ═══════════════════════════════════════════════════════════
+#  Кэш получателей почты
+# ═══════════════════════════════════════════════════════════
+
+
+class TestMailRecipientsCache:
+    @pytest.mark.asyncio
+    async def test_cached_until_refresh(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        class ParamsSession(_RoutedSession):
+            def __init__(self, routes):
+                super().__init__(routes)
+                self.params = []
+
+            async def get(self, path, **kw):
+                self.params.append(kw.get("params"))
+                return await super().get(path, **kw)
+
+        session = swap_http(ns, ParamsSession({
+            "mail/recipients": [{"id": "QQ==", "name": "Иванова И. И."}],
+        }))
+        first = await ns.mail_recipients()
+        assert dict(session.params[0]) == {
+            "userId": "-1", "organizationId": "-1",
+            "funcType": "2", "orgType": "1", "group": "1",
+        }
+        first.clear()
+        second = await ns.mail_recipients()
+        assert [r.name for r in second] == ["Иванова И. И."]
+        assert session.calls == ["mail/recipients"]
+
+        await ns.mail_recipients(force_refresh=True)
+        assert len(session.calls) == 2
+
+        ns._student_id = 99  # другой ученик — другой список
+        await ns.mail_recipients()
+        assert len(session.calls) == 3
+
+
+# ═══════════════════════════════════════════════════════════
+#  mail_send
+# ═══════════════════════════════════════════════════════════
+
+
+class TestMailSend:
+    @pytest.mark.asyncio
+    async def test_body_serialized_once(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        sent = []
+
+        class CapturingSession(_RoutedSession):
+            async def post(self, path, **kw):
+                sent.append((path, kw))
+                return _FakeResponse(None)
+
+        swap_http(ns, CapturingSession({}))
+        await ns.mail_send("Тема", "Текст", ["QQ==", "Qg=="])
+
+        path, kw = sent[0]
+        assert path == "mail/messages/send"
+        assert kw["headers"] == {"content-type": "application/json"}
+        assert json.loads(kw["content"]) == {
+            "subject": "Тема",
+            "text": "Текст",
+            "to": [{"id": "QQ=="}, {"id": "Qg=="}],
+            "cc": [],
+            "bcc": [],
+            "notify": False,
+            "fileAttachments": [],
+        }
+
+
+# ═══════════════════════════════════════════════════════════
+#  close(graceful=False)
+# ═══════════════════════════════════════════════════════════
+
+
+class TestFastClose:
+    @pytest.mark.asyncio
+    async def test_slow_logout_does_not_block(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+
+        class HangingSession(_RoutedSession):
+            async def post(self, path, **kw):
+                await asyncio.sleep(10)
+
+        swap_http(ns, HangingSession({}))
+        await asyncio.wait_for(ns.close(timeout=0.05, graceful=False), 1)
+        assert ns._http.closed
+
+    @pytest.mark.asyncio
+    async def test_logout_errors_ignored(self, swap_http):
+        ns = NetSchool("https://sgo.example.ru")
+        swap_http(ns, _RoutedSession({"auth/logout": _status_error(500)}))
+        await ns.close(graceful=False)
+        assert ns._http.closed
+
+
+# ═══════════════════════════════════════════════════════════
+#  Опрос нескольких серверов
+# ═══════════════════════════════════════════════════════════
+
+
+class TestProbeMany:
+    @pytest.mark.asyncio
+    async def test_failed_hosts_become_none(self, monkeypatch):
+        active = peak = 0
+
+        async def fake_get_login_methods(url, *, timeout=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if "dead" in url:
+                raise ServerUnavailable("нет ответа")
+            return url.upper()
+
+        monkeypatch.setattr(client_mod, "get_login_methods", fake_get_login_methods)
+        urls = ["https://a.ru", "https://dead.ru", "https://b.ru", "https://c.ru"]
+        found = await get_login_methods_multi(urls, concurrency=2)
+        assert list(found) == urls
+        assert found["https://dead.ru"] is None
+        assert found["https://a.ru"] == "HTTPS://A.RU"
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_search_schools_multi_passes_query(self, monkeypatch):
+        calls = []
+
+        async def fake_search_schools(url, query="", *, timeout=None):
+            calls.append((url, query))
+            return []
+
+        monkeypatch.setattr(client_mod, "search_schools", fake_search_schools)
+        found = await search_schools_multi(["https://a.ru"], "Лицей")
+        assert found == {"https://a.ru": []}
+        assert calls == [("https://a.ru", "Лицей")]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_urls_probed_once(self, monkeypatch):
+        calls = []
+
+        async def fake_search_schools(url, query="", *, timeout=None):
+            calls.append(url)
+            return []
+
+        monkeypatch.setattr(client_mod, "search_schools", fake_search_schools)
+        found = await search_schools_multi(
+            ["https://a.ru", "https://b.ru", "https://a.ru"], "Лицей",
+        )
+        assert list(found) == ["https://a.ru", "https://b.ru"]
+        assert calls == ["https://a.ru", "https://b.ru"]
+
+
+# ═══════════════════════════════════════════════════════════
+#  Общее завершение входа через ESIA
+# ═══════════════════════════════════════════════════════════
+
+
+class TestCompleteEsiaLogin:
+    @pytest.mark.asyncio
+    async def test_steps_in_order(self, monkeypatch):
+        ns = NetSchool("https://sgo.example.ru")
+        steps = []
+
+        async def resolve(self, client, data, otp_callback=None):
+            steps.append(("resolve", data["action"]))
+            return "https://esia.gosuslugi.ru/callback"
+
+        async def callback(self, client, url):
+            steps.append(("callback", url))
+            return "state-1"
+
+        async def finalize(self, client, origin, state, school, *, timeout=None):
+            steps.append(("finalize", origin, state, school))
+
+        monkeypatch.setattr(NetSchool, "_esia_resolve_login_response", resolve)
+        monkeypatch.setattr(NetSchool, "_esia_callback_to_login_state", callback)
+        monkeypatch.setattr(NetSchool, "_esia_finalize_login", finalize)
+
+        await ns._complete_esia_login(
+            None, "https://sgo.example.ru", {"action": "DONE"}, "Лицей",
+        )
+        assert steps == [
+            ("resolve", "DONE"),
+            ("callback", "https://esia.gosuslugi.ru/callback"),
+            ("finalize", "https://sgo.example.ru", "state-1", "Лицей"),
+        ]
+        await ns._http.close()
+
+    @pytest.mark.asyncio
+    async def test_missing_redirect(self, monkeypatch):
+        ns = NetSchool("https://sgo.example.ru")
+
+        async def resolve(self, client, data, otp_callback=None):
+            return ""
+
+        monkeypatch.setattr(NetSchool, "_esia_resolve_login_response", resolve)
+        with pytest.raises(ESIAError, match="redirect_url"):
+            await ns._complete_esia_login(
+                None, "https://sgo.example.ru", {}, None,
+            )
+        await ns._http.close()
@@ -1,10 +1,12 @@
 """Тесты парсинга моделей данных."""
 
 import datetime
+import pickle
 
 from netschoolpy.models import (
     Announcement,
     Assignment,
+    AssignmentType,
     Attachment,
     Author,
     Day,
@@ -220,6 +222,18 @@ class TestAssignment:
         assert a.is_duty is True
         assert a.mark == 2
 
+    def test_from_raw_namedtuple_mapping(self):
+        raw = {
+            "id": 104,
+            "typeId": 3,
+            "assignmentName": "Ответ на уроке",
+            "dueDate": "2024-09-19T00:00:00",
+        }
+        mapping = {3: AssignmentType("Ответ на уроке", "О")}
+        a = Assignment.from_raw(raw, mapping)
+        assert a.kind == "Ответ на уроке"
+        assert a.kind_abbr == "О"
+
     def test_from_raw_old_mapping_format(self):
         """Обратная совместимость: старый формат {id: name}."""
         raw = {
@@ -381,6 +395,11 @@ class TestShortSchool:
         assert s.short_name == 'МОУ "Средняя школа № 24"'
         assert s.address == ""  # address=None → ""
 
+    def test_slots_and_pickle(self):
+        s = ShortSchool.from_raw({"name": "Школа №2", "id": 43})
+        assert not hasattr(s, "__dict__")
+        assert pickle.loads(pickle.dumps(s)) == s
+
 
 class TestSchool:
     def test_from_raw(self):
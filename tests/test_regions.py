@@ -102,3 +102,9 @@ class TestGetUrl:
     def test_all_regions_findable(self) -> None:
         for name in REGIONS:
             assert get_url(name) == REGIONS[name], f"get_url({name!r}) не нашёл"
+
+    def test_cached(self) -> None:
+        get_url.cache_clear()
+        assert get_url("Тверская") == "https://sgo.tvobr.ru"
+        assert get_url("Тверская") == "https://sgo.tvobr.ru"
+        assert get_url.cache_info().hits == 1